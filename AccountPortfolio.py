@@ -0,0 +1,55 @@
+from colorama import Back, Style
+from cointable import Table, print_table
+from coinapi import fetch_tickers_bulk
+from coinindex import load_index
+from coinvaluation import read_positions, Valuation
+
+convert = 'USD'
+
+# one 'ACCOUNT TICKER amount' per line; plain 'TICKER amount' lines count towards 'default'
+positions_file = 'accounts.txt'
+
+# holdings in the top bulk_max_rank coins are priced from the ranked ticker pages
+bulk_max_rank = 2000
+
+# symbol -> id lookups come from the local listings index
+ticker_url_pairs = load_index()
+
+positions = read_positions(positions_file)
+
+coin_ids = [ticker_url_pairs.get(symbol) for symbol in positions.symbols]
+currencies, bulk_stats = fetch_tickers_bulk(coin_ids, convert, ranks=ticker_url_pairs.ranks(coin_ids),
+                                            max_rank=bulk_max_rank)
+ticker_url_pairs.remember_ranks(currencies)
+
+prices = {}
+for symbol, currency in zip(positions.symbols, currencies):
+    if currency is not None:
+        prices[symbol] = currency['quotes'][convert]['price']
+
+valuation = Valuation(positions, prices)
+
+print()
+print('ACCOUNTS')
+print()
+
+counts = [0] * len(positions.accounts)
+for code in positions.account_codes.tolist():
+    counts[code] += 1
+
+table = Table(['Account', 'Positions', convert + ' Value'])
+for account, count in zip(positions.accounts, counts):
+    table.add_row([account, '{:,}'.format(count), '$' + '{:,.2f}'.format(valuation.account_totals[account])])
+
+print_table(table)
+print()
+
+if valuation.missing:
+    print('No price for: ' + ', '.join(valuation.missing))
+    print()
+
+print('Total Value: ' + Back.GREEN + '$' + '{:,.2f}'.format(valuation.total) + Style.RESET_ALL
+      + ' across ' + '{:,}'.format(len(positions)) + ' positions in ' + '{:,}'.format(len(positions.symbols))
+      + ' coins')
+print('Exact total: $' + str(valuation.total))
+print()
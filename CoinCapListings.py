@@ -1,10 +1,10 @@
 import json
 import requests
+from coinapi import API_URL, get_json
 
-listing_url = 'https://api.coinmarketcap.com/v2/listings/'
+listing_url = API_URL + 'listings/'
 
-request = requests.get(listing_url)
-results = request.json()
+results = get_json(listing_url)
 
 # print(json.dumps(results, sort_keys=True, indent=4))
 
@@ -1,91 +1,92 @@
 import os
 import json
+import time
 import requests
-from datetime import datetime
-from prettytable import PrettyTable
-from colorama import Fore, Back, Style
+from cointable import LiveTable, print_table
+from coinapi import fetch_tickers, fetch_tickers_bulk
+from coinclient.client import read_positions
+from coinclient.views import portfolio_summary, portfolio_table
+from coindelta import DeltaTracker
+from coinindex import load_index
+from coinstore import SnapshotStore
 
 convert = 'USD'
 
-listings_url = 'https://api.coinmarketcap.com/v2/listings/?convert=' + convert
-url_end = '?structure=array&convert=' + convert
-
-request = requests.get(listings_url)
-results = request.json()
-data = results['data']
-
-ticker_url_pairs = {}
-for currency in data:
-    symbol = currency['symbol']
-    url = currency['id']
-    ticker_url_pairs[symbol] = url
-
-print()
-print('MY PORTFOLIO')
-print()
-
-portfolio_value = 0.00
-last_updated = 0
-
-table = PrettyTable(['Asset', 'Amount Owned', convert + ' Value', 'Price', '1h', '24h', '7d'])
-
-with open('portfolio.txt') as inp:
-    for line in inp:
-        ticker, amount = line.split()
-        ticker = ticker.upper()
-
-        ticker_url = 'https://api.coinmarketcap.com/v2/ticker/' + str(ticker_url_pairs[ticker]) + '/' + url_end
-
-        request = requests.get(ticker_url)
-        results = request.json()
-
-        currency = results['data'][0]
-        rank = currency['rank']
-        name = currency['name']
-        last_updated = currency['last_updated']
-        symbol = currency['symbol']
-        quotes = currency['quotes'][convert]
-        hour_change = quotes['percent_change_1h']
-        day_change = quotes['percent_change_24h']
-        week_change = quotes['percent_change_7d']
-        price = quotes['price']
-
-        value = float(price) * float(amount)
-
-        if hour_change > 0:
-            hour_change = Back.GREEN + str(hour_change) + '%' + Style.RESET_ALL
-        else:
-            hour_change = Back.RED + str(hour_change) + '%' + Style.RESET_ALL
-
-        if day_change > 0:
-            day_change = Back.GREEN + str(day_change) + '%' + Style.RESET_ALL
-        else:
-            day_change = Back.RED + str(day_change) + '%' + Style.RESET_ALL
-
-        if week_change > 0:
-            week_change = Back.GREEN + str(week_change) + '%' + Style.RESET_ALL
-        else:
-            week_change = Back.RED + str(week_change) + '%' + Style.RESET_ALL
-
-        portfolio_value += value
-
-        value_string = '{:,}'.format(round(value,2))
-
-        table.add_row([name + ' (' + symbol + ')',
-                       amount,
-                       '$' + value_string,
-                       '$' + str(price),
-                       str(hour_change),
-                       str(day_change),
-                       str(week_change)])
-
-print(table)
-print()
-
-portfolio_value_string = '{:,}'.format(round(portfolio_value,2))
-last_updated_string = datetime.fromtimestamp(last_updated).strftime('%B %d, %Y at %I:%M%p')
-
-print('Total Portfolio Value: ' + Back.GREEN + '$' + portfolio_value_string + Style.RESET_ALL)
-print()
-print('API Results Last Updated on ' + last_updated_string)
-print()
+# 'concurrent' pulls every position at once over a pooled session, 'sequential' one at a time,
+# 'bulk' pulls the ranked ticker pages covering the holdings and only asks for the rest one by one
+fetch_mode = 'concurrent'
+max_workers = 16
+
+# keep every fetched ticker in the local snapshot store for later analysis
+record_snapshots = True
+
+# rows per screen when printing to a terminal, None prints the whole table at once
+page_size = None
+
+# watch mode keeps the table on screen and refreshes it every refresh_interval seconds,
+# redrawing only the cells that changed; with fetch_mode = 'bulk' a few hundred positions
+# refresh in a handful of requests
+watch = False
+refresh_interval = 30
+
+# symbol -> id lookups come from the local listings index
+ticker_url_pairs = load_index()
+store = SnapshotStore(convert=convert)
+# each refresh only stores the positions whose last_updated has moved
+changes = DeltaTracker()
+
+
+def fetch_positions(coin_ids):
+    bulk_stats = None
+    if fetch_mode == 'bulk':
+        currencies, bulk_stats = fetch_tickers_bulk(coin_ids, convert, ranks=ticker_url_pairs.ranks(coin_ids),
+                                                    max_workers=max_workers)
+    else:
+        workers = max_workers if fetch_mode == 'concurrent' else 1
+        currencies = fetch_tickers(coin_ids, convert, max_workers=workers)
+    ticker_url_pairs.remember_ranks(currencies)
+
+    changed = changes.delta(currencies)
+    if record_snapshots:
+        store.append(changed)
+
+    return currencies, bulk_stats
+
+
+def build_table(positions, currencies):
+    return portfolio_table([(ticker, amount, currency) for (ticker, amount), currency in zip(positions, currencies)],
+                           convert)
+
+
+positions = read_positions()
+coin_ids = [ticker_url_pairs.get(ticker) for ticker, amount in positions]
+
+if not watch:
+    print()
+    print('MY PORTFOLIO')
+    print()
+
+    currencies, bulk_stats = fetch_positions(coin_ids)
+    table, portfolio_value, last_updated, failed_tickers = build_table(positions, currencies)
+
+    print_table(table, page_size)
+    for line in portfolio_summary(portfolio_value, last_updated, failed_tickers, bulk_stats):
+        print(line)
+else:
+    screen = LiveTable()
+    try:
+        while True:
+            started = time.monotonic()
+            currencies, bulk_stats = fetch_positions(coin_ids)
+            table, portfolio_value, last_updated, failed_tickers = build_table(positions, currencies)
+            refresh_time = time.monotonic() - started
+
+            footer = portfolio_summary(portfolio_value, last_updated, failed_tickers, bulk_stats)
+            footer.append(changes.summary())
+            footer.append('Refreshed in ' + '{:.2f}'.format(refresh_time) + 's, next refresh in '
+                          + str(refresh_interval) + 's (Ctrl+C to quit)')
+            screen.draw(table, header=['', 'MY PORTFOLIO', ''], footer=footer)
+
+            time.sleep(max(0, refresh_interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        screen.close()
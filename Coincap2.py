@@ -3,50 +3,73 @@ import json
 import time
 import requests
 from datetime import datetime
+from coinapi import fetch_ticker
+from coindelta import DeltaTracker
+from coinindex import load_index
+from coinalerts import AlertIndex, AlertsFile, AlertScheduler
 
 convert = 'USD'
 
-listings_url = 'https://api.coinmarketcap.com/v2/listings/?convert=' + convert
-url_end = '?structure=array&convert=' + convert
+# polling speeds up as a price nears its alert, but never goes past this many requests a minute
+requests_per_minute = 30
 
-request = requests.get(listings_url)
-results = request.json()
-data = results['data']
-
-ticker_url_pairs = {}
-for currency in data:
-    symbol = currency['symbol']
-    url = currency['id']
-    ticker_url_pairs[symbol] = url
+# symbol -> id lookups come from the local listings index
+ticker_url_pairs = load_index()
 
 print()
 print('ALERTS TRACKING...')
 print()
 
-already_hit_symbols = []
-
-while True:
-    with open('alerts.txt') as inp:
-        for line in inp:
-            ticker, amount = line.split()
-            ticker = ticker.upper()
-            ticker_url = 'https://api.coinmarketcap.com/v2/ticker/' + str(ticker_url_pairs[ticker]) + '/' + url_end
-
-            request = requests.get(ticker_url)
-            results = request.json()
-
-            currency = results['data'][0]
-            name = currency['name']
-            last_updated = currency['last_updated']
-            symbol = currency['symbol']
-            quotes = currency['quotes'][convert]
-            price = quotes['price']
-
-            if float(price) >= float(amount) and symbol not in already_hit_symbols:
-                os.system('say ' + name + ' hit ' + amount)
-                last_updated_string = datetime.fromtimestamp(last_updated).strftime('%B %d, %Y at %I:%M%p')
-                print(name + ' hit ' + amount + ' on ' + last_updated_string)
-                already_hit_symbols.append(symbol)
-
-    print('...')
-    time.sleep(300)
+alerts_file = AlertsFile('alerts.txt')
+alerts = AlertIndex()
+
+# a coin's alerts are only checked again once its last_updated moves, since
+# until then its price is the one they were last checked against; reloading
+# alerts.txt forgets them all so new alerts are checked on the next poll
+changes = DeltaTracker()
+
+
+def fetch_currency(symbol):
+    return fetch_ticker(ticker_url_pairs[symbol], convert)
+
+
+def check_alerts(symbol, currency):
+    if not changes.delta([currency]):
+        return
+
+    name = currency['name']
+    last_updated = currency['last_updated']
+    quotes = currency['quotes'][convert]
+    price = quotes['price']
+
+    for alert in alerts.update(symbol, float(price)):
+        verb = ' hit ' if alert.direction == 'above' else ' fell to '
+        os.system('say ' + name + verb + alert.amount)
+        last_updated_string = datetime.fromtimestamp(last_updated).strftime('%B %d, %Y at %I:%M%p')
+        print(name + verb + alert.amount + ' on ' + last_updated_string)
+
+
+def threshold_distance(symbol, currency):
+    return alerts.distance(symbol, float(currency['quotes'][convert]['price']))
+
+
+scheduler = AlertScheduler(fetch_currency, check_alerts, threshold_distance, requests_per_minute)
+
+try:
+    while True:
+        if alerts_file.changed():
+            known = []
+            for alert in alerts_file.load():
+                if alert.symbol not in ticker_url_pairs:
+                    print('Unknown symbol in alerts.txt: ' + alert.symbol)
+                    continue
+                known.append(alert)
+            alerts = alerts.replace(known)
+            scheduler.set_symbols(alerts.symbols)
+            changes.forget()
+
+        scheduler.step()
+except KeyboardInterrupt:
+    print()
+    print('Alerts checked on ' + str(changes.changes) + ' of ' + str(changes.records) + ' polls ('
+          + '{:.0%}'.format(changes.change_rate()) + '), the rest had no new price')
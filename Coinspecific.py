@@ -1,23 +1,24 @@
 import requests
 import json
+import time
+from coincache import ResponseCache
+from coinapi import API_URL, get_json
+from coinindex import load_index
+from coinsearch import SearchIndex
 
 convert = 'USD'
 
-listing_url = 'https://api.coinmarketcap.com/v2/listings/'
 url_end = '?structure=array&convert=' + convert
 
-request = requests.get(listing_url)
-results = request.json()
+# symbol -> id lookups come from the local listings index
+ticker_url_pairs = load_index()
 
-data = results['data']
+# names, prefixes and near-miss spellings are resolved through the search index
+search = SearchIndex(ticker_url_pairs.listings())
 
-ticker_url_pairs = {}
-for currency in data:
-    symbol = currency['symbol']
-    url = currency['id']
-    ticker_url_pairs[symbol] = url
-
-# print(ticker_url_pairs)
+# repeat lookups within cache_ttl seconds are answered from the local response cache
+cache_ttl = 60
+response_cache = ResponseCache(ttl=cache_ttl)
 
 while True:
 
@@ -25,10 +26,29 @@ while True:
     choice = input("Enter the ticker symbol of a cryptocurrency: ")
     choice = choice.upper()
 
-    ticker_url = 'https://api.coinmarketcap.com/v2/ticker/' + str(ticker_url_pairs[choice]) + '/' + url_end
-
-    request = requests.get(ticker_url)
-    results = request.json()
+    if choice not in ticker_url_pairs:
+        matches = search.exact(choice)
+        if not matches:
+            suggestions = search.suggest(choice)
+            if suggestions:
+                print('No coin called ' + choice + '. Did you mean: '
+                      + ', '.join(currency['symbol'] + ' (' + currency['name'] + ')' for currency in suggestions))
+            else:
+                print('No coin called ' + choice + '.')
+            continue
+        choice = matches[0]['symbol'].upper()
+
+    other_ids = ticker_url_pairs.ids(choice)[1:]
+    if other_ids:
+        print('Note: ' + choice + ' is also listed under ids ' + ', '.join(str(coin_id) for coin_id in other_ids))
+
+    ticker_url = API_URL + 'ticker/' + str(ticker_url_pairs[choice]) + '/' + url_end
+
+    hits = response_cache.stats['hits']
+    started = time.perf_counter()
+    results = get_json(ticker_url, cache=response_cache)
+    elapsed = time.perf_counter() - started
+    source = 'cache' if response_cache.stats['hits'] > hits else 'upstream'
 
     # print(json.dumps(results, sort_keys=True, indent=4))
 
@@ -64,9 +84,13 @@ while True:
     print('Total supply: \t\t' + total_supply_string)
     print('Circulating supply: \t' + circulating_supply_string)
     print('Percentage of coins in circulation: ' + str(int(circulating_supply / total_supply * 100)))
+    print('(from ' + source + ' in ' + '{:,.0f}'.format(elapsed * 1000000) + ' microseconds)')
     print()
 
     choice = input('Again? (y/n): ')
 
     if choice == 'n':
         break
+
+print()
+print(response_cache.summary())
@@ -1,26 +1,77 @@
 
 import json
 import requests
-from datetime import datetime
-from prettytable import PrettyTable
-from colorama import Fore, Back, Style
+from cointable import Table, print_table
+from coinapi import API_URL, Snapshot, get_json
+from coinclient.client import SORT_FIELDS
+from coinclient.views import TOP_HEADERS, top_cells
+from coindelta import DeltaCache
+from coinrecord import MarketSnapshot
+from coinstore import SnapshotStore
 
 convert = 'USD'
 
-global_url = 'https://api.coinmarketcap.com/v2/global/?convert=' + convert
+# keep every fetched ticker in the local snapshot store for later analysis
+record_snapshots = True
+store = SnapshotStore(convert=convert)
 
-request = requests.get(global_url)
-results = request.json()
+# the top 100 is fetched once and re-sorted locally for each menu choice until it is this old
+snapshot_ttl = 60
+
+# rows per screen when printing to a terminal, None prints the whole table at once
+page_size = None
+
+global_url = API_URL + 'global/?convert=' + convert
+
+results = get_json(global_url)
 data = results['data']
 
 global_cap = int(data['quotes'][convert]['total_market_cap'])
 global_cap_string = '{:,}'.format(global_cap)
 
+ticker_url = API_URL + 'ticker/?structure=array&sort=rank&convert=' + convert
+
+
+def table_row(coin):
+    # every cell but the rank, which moves when other coins pass this one and is
+    # added when the table is printed
+    return top_cells(coin.to_ticker(), convert)
+
+
+# table rows by coin id; a refresh only rebuilds the rows of coins whose
+# last_updated has moved, and only those coins are added to the store
+rows = DeltaCache(table_row)
+
+
+def fetch_top100():
+    data = MarketSnapshot.from_tickers(get_json(ticker_url)['data'], convert)
+    changed = rows.update(data)
+    if record_snapshots:
+        store.append(changed)
+    return data
+
+
+# (field, descending) for each menu choice; sorting a snapshot gives a view in
+# that order, with missing values last, without copying the rows
+sort_keys = {
+    '1': SORT_FIELDS['rank'],
+    '2': SORT_FIELDS['change'],
+    '3': SORT_FIELDS['volume'],
+}
+
+snapshot = Snapshot(fetch_top100, snapshot_ttl)
+
 while True:
 
     print()
     print('CoinMarketCap Explorer Menu')
     print('The global market cap is $' + global_cap_string)
+    if snapshot.expired():
+        print('Ticker data will be refreshed on the next choice')
+    else:
+        print('Ticker data is ' + str(int(snapshot.age())) + 's old (refreshes every ' + str(snapshot_ttl) + 's)')
+    if rows.tracker.refreshes:
+        print(rows.tracker.summary())
     print()
     print('1 - Top 100 sorted by rank')
     print('2 - Top 100 sorted by 24 hour change')
@@ -29,71 +80,21 @@ while True:
     print()
     choice = input('What is your choice? (1-3): ')
 
-    ticker_url = 'https://api.coinmarketcap.com/v2/ticker/?structure=array&sort='
-
-    if choice == '1':
-        ticker_url += 'rank'
-    if choice == '2':
-        ticker_url += 'percent_change_24h'
-    if choice == '3':
-        ticker_url += 'volume_24h'
     if choice == '0':
         break
+    if choice not in sort_keys:
+        continue
 
-    request = requests.get(ticker_url)
-    results = request.json()
-    data = results['data']
+    data = snapshot.get().sort(*sort_keys[choice])
 
-    table = PrettyTable(['Rank', 'Asset', 'Price', 'Market Cap', 'Volume', '1h', '24h', '7d'])
+    table = Table(TOP_HEADERS)
 
     print()
-    for currency in data:
-        rank = currency['rank']
-        name = currency['name']
-        symbol = currency['symbol']
-        quotes = currency['quotes'][convert]
-        market_cap = quotes['market_cap']
-        hour_change = quotes['percent_change_1h']
-        day_change = quotes['percent_change_24h']
-        week_change = quotes['percent_change_7d']
-        price = quotes['price']
-        volume = quotes['volume_24h']
-
-        if hour_change is not None:
-            if hour_change > 0:
-                hour_change = Back.GREEN + str(hour_change) + '%' + Style.RESET_ALL
-            else:
-                hour_change = Back.RED + str(hour_change) + '%' + Style.RESET_ALL
-
-        if day_change is not None:
-            if day_change > 0:
-                day_change = Back.GREEN + str(day_change) + '%' + Style.RESET_ALL
-            else:
-                day_change = Back.RED + str(day_change) + '%' + Style.RESET_ALL
-
-        if week_change is not None:
-            if week_change > 0:
-                week_change = Back.GREEN + str(week_change) + '%' + Style.RESET_ALL
-            else:
-                week_change = Back.RED + str(week_change) + '%' + Style.RESET_ALL
-
-        if volume is not None:
-            volume_string = '{:,}'.format(volume)
-
-        if market_cap is not None:
-            market_cap_string = '{:,}'.format(market_cap)
-
-        table.add_row([rank,
-                       name + ' ( ' + symbol + ')',
-                       '$' + str(price),
-                       '$' + str(market_cap),
-                       '$' + volume_string,
-                       str(hour_change),
-                       str(day_change),
-                       str(week_change)])
+    for rank, row in zip(data.values('rank'), rows.ordered(data.column('id'))):
+        table.add_row([rank] + row)
 
     print()
-    print(table)
+    print_table(table, page_size)
     print()
 
     choice = input('Again? (y/n): ')
@@ -0,0 +1,75 @@
+import os
+from datetime import datetime
+from colorama import Back, Style
+from cointable import Table, print_table
+from coinbacktest import parse_time, read_trades, run_backtest
+from coinindex import load_index
+from coinstore import SnapshotStore
+
+convert = 'USD'
+
+# 'TIME TICKER amount' per line (negative amounts are sells); plain 'TICKER amount'
+# lines are starting holdings, so portfolio.txt works as a buy-and-hold history
+trades_file = 'trades.txt' if os.path.exists('trades.txt') else 'portfolio.txt'
+
+# replay window, as epoch seconds or ISO dates; None uses every recorded snapshot
+start = None
+end = None
+
+# symbol -> id lookups come from the local listings index
+ticker_url_pairs = load_index()
+store = SnapshotStore(convert=convert)
+
+trades, unknown = read_trades(trades_file, ticker_url_pairs)
+result = run_backtest(store, trades,
+                      None if start is None else parse_time(start),
+                      None if end is None else parse_time(end))
+
+print()
+print('PORTFOLIO BACKTEST (' + trades_file + ')')
+print()
+
+if unknown:
+    print('Unknown symbols: ' + ', '.join(unknown))
+    print()
+
+if not len(result.times):
+    print('No recorded snapshots to replay yet; run the coin scripts with record_snapshots on first.')
+    print()
+else:
+    def when(timestamp):
+        return datetime.fromtimestamp(timestamp).strftime('%B %d, %Y at %I:%M%p')
+
+    names = {}
+    for currency in ticker_url_pairs.listings():
+        names[currency['id']] = currency['name'] + ' (' + currency['symbol'] + ')'
+
+    table = Table(['Asset', 'P&L Contribution', 'Share'])
+    total_pnl = result.contributions.sum()
+    order = sorted(range(len(result.coin_ids)), key=lambda i: -abs(result.contributions[i]))
+    for i in order:
+        share = result.contributions[i] / total_pnl * 100 if total_pnl else 0.0
+        table.add_row([names.get(result.coin_ids[i], str(result.coin_ids[i])),
+                       '$' + '{:,.2f}'.format(result.contributions[i]),
+                       '{:.1f}'.format(share) + '%'])
+
+    print_table(table)
+    print()
+    print('Snapshots replayed: ' + '{:,}'.format(len(result.times)) + ' from ' + when(result.times[0])
+          + ' to ' + when(result.times[-1]))
+    print('Starting value: $' + '{:,.2f}'.format(result.values[0]))
+    print('Ending value: ' + Back.GREEN + '$' + '{:,.2f}'.format(result.values[-1]) + Style.RESET_ALL)
+    if result.cash.any():
+        print('Ending cash: $' + '{:,.2f}'.format(result.cash[-1]) + ' (included in the value)')
+    print('Market P&L: $' + '{:,.2f}'.format(total_pnl))
+    print('Max drawdown: ' + '{:.2f}'.format(result.max_drawdown * 100) + '% at '
+          + when(result.times[int(result.drawdown.argmin())]))
+    print()
+    if result.before_range:
+        print(str(len(result.before_range)) + ' trades dated before the first snapshot were counted in the '
+              'opening position')
+    if result.after_range:
+        print(str(len(result.after_range)) + ' trades dated after the last snapshot were not replayed (latest on '
+              + when(max(trade[0] for trade in result.after_range)) + ')')
+    if result.before_range or result.after_range:
+        print()
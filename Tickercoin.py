@@ -1,9 +1,49 @@
 import json
 import requests
+from coinapi import API_URL, Snapshot, get_json, stream_tickers
+from coinclient.views import ticker_block
+from coindelta import DeltaCache, DeltaTracker
+from coinfx import BASE, FxRates
+from coinrecord import MarketSnapshot
+from coinstore import SnapshotStore
+
+# keep every fetched ticker in the local snapshot store for later analysis
+record_snapshots = True
+
+# print the whole raw response before the summary (slow for large limits)
+debug_dump = False
+
+# tickers are fetched once in BASE and converted locally, so the same listing
+# can be viewed in other currencies for snapshot_ttl seconds without refetching
+snapshot_ttl = 60
+fx = FxRates()
+listings = {}
+
+# (exchange rate, printed text of every coin) per listing and currency; a
+# refreshed listing only re-formats the coins whose last_updated has moved, and
+# a new exchange rate starts the currency's text over
+blocks = {}
+# only coins that changed since they were last stored are added to the store
+stored = DeltaTracker()
+
+
+def coin_block(coin):
+    # everything but the leading rank, which moves when other coins pass this one
+    return ticker_block(coin.to_ticker(), coin.convert)
+
+
+def fetch_listing(url):
+    # only the fields printed below are kept, one coin at a time, and the listing
+    # is held as one compact array so several cached listings stay small
+    data = MarketSnapshot.from_tickers(stream_tickers(url, BASE), BASE)
+    if record_snapshots:
+        SnapshotStore(convert=BASE).append(stored.delta(data))
+    return data
+
 
 while True:
 
-    ticker_url = 'https://api.coinmarketcap.com/v2/ticker/?structure=array'
+    ticker_url = API_URL + 'ticker/?structure=array'
 
     limit = 100
     start = 1
@@ -18,48 +58,32 @@ while True:
         sort = input('What do you want to sort by?: ')
         convert = input('What is your local currency?: ')
 
-    ticker_url += '&limit=' + str(limit) + '&sort=' + sort + '&start=' + str(start) + '&convert=' + convert
-
-    request = requests.get(ticker_url)
-    results = request.json()
-
-    print(json.dumps(results, sort_keys=True, indent=4))
-
-    data = results['data']
+    ticker_url += '&limit=' + str(limit) + '&sort=' + sort + '&start=' + str(start) + '&convert=' + BASE
+
+    if debug_dump:
+        results = get_json(ticker_url)
+        print(json.dumps(results, sort_keys=True, indent=4))
+        data = MarketSnapshot.from_tickers(results['data'], BASE)
+        if record_snapshots:
+            SnapshotStore(convert=BASE).append(stored.delta(data))
+    else:
+        if ticker_url not in listings:
+            listings[ticker_url] = Snapshot(lambda url=ticker_url: fetch_listing(url), snapshot_ttl)
+        data = listings[ticker_url].get()
+
+    rate = fx.rate(convert)
+    if blocks.get((ticker_url, convert), (None,))[0] != rate:
+        blocks[(ticker_url, convert)] = (rate, DeltaCache(coin_block))
+    text = blocks[(ticker_url, convert)][1]
+    listing = data
+    data = fx.localize_snapshot(data, convert)
+    text.update(data, source=listing)
 
     print()
-    for currency in data:
-        rank = currency['rank']
-        name = currency['name']
-        symbol = currency['symbol']
-
-        circulating_supply = int(currency['circulating_supply'])
-        total_supply = int(currency['total_supply'])
-
-        quotes = currency['quotes'][convert]
-        market_cap = quotes['market_cap']
-        hour_change = quotes['percent_change_1h']
-        day_change = quotes['percent_change_24h']
-        week_change = quotes['percent_change_7d']
-        price = quotes['price']
-        volume = quotes['volume_24h']
-
-        volume_string = '{:,}'.format(volume)
-        market_cap_string = '{:,}'.format(market_cap)
-        circulating_supply_string = '{:,}'.format(circulating_supply)
-        total_supply_string = '{:,}'.format(total_supply)
-
-        print(str(rank) + ': ' + name + ' (' + symbol + ')')
-        print('Market cap: \t\t$' + market_cap_string)
-        print('Price: \t\t\t$' + str(price))
-        print('24h Volume: \t\t$' + volume_string)
-        print('Hour change: \t\t' + str(hour_change) + '%')
-        print('Day change: \t\t' + str(day_change) + '%')
-        print('Week change: \t\t' + str(week_change) + '%')
-        print('Total supply: \t\t' + total_supply_string)
-        print('Circulating supply: \t' + circulating_supply_string)
-        print('Percentage of coins in circulation: ' + str(int(circulating_supply / total_supply * 100)))
-        print()
+    for rank, block in zip(data.values('rank'), text.ordered(data.column('id'))):
+        print(str(rank) + ': ' + block)
+    print(text.tracker.summary())
+    print()
 
     choice = input('Again? (y/n): ')
 
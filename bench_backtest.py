@@ -0,0 +1,70 @@
+# Times coinbacktest on a synthetic snapshot history.
+# Writes --days of snapshots every --interval seconds for --coins coins into a
+# temporary store, then replays a random trade history over all of it.
+#
+#   python bench_backtest.py --days 365 --coins 500
+
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from coinbacktest import run_backtest
+from coinstore import FIELDS, SnapshotStore
+
+
+def write_history(store, steps, coins, interval, seed=1, block=2000):
+    # Appends the raw columns directly, a block of snapshots at a time, so the
+    # benchmark spends its time replaying rather than building ticker dicts.
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(0.01, 1000, coins)
+    started = time.time() - steps * interval
+    for first in range(0, steps, block):
+        count = min(block, steps - first)
+        moves = np.exp(rng.normal(0, 0.002, (count, coins)).cumsum(axis=0))
+        block_prices = prices * moves
+        prices = block_prices[-1]
+        columns = {
+            'fetched_at': np.repeat(started + (first + np.arange(count)) * interval, coins),
+            'id': np.tile(np.arange(1, coins + 1, dtype='<i4'), count),
+            'price': block_prices.ravel(),
+        }
+        columns['last_updated'] = columns['fetched_at'].astype('<i8')
+        for field, dtype in FIELDS:
+            values = columns.get(field, np.full(count * coins, np.nan))
+            with open(store._field_path(field), 'ab') as out:
+                out.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+    return started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest benchmark')
+    parser.add_argument('--days', type=float, default=365)
+    parser.add_argument('--coins', type=int, default=500)
+    parser.add_argument('--interval', type=int, default=300)
+    parser.add_argument('--trades', type=int, default=5000)
+    args = parser.parse_args()
+
+    steps = int(args.days * 86400 / args.interval)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(tmp)
+        started = write_history(store, steps, args.coins, args.interval)
+
+        rng = random.Random(1)
+        trades = [(None, coin_id, rng.uniform(0, 10)) for coin_id in range(1, args.coins + 1)]
+        trades += [(started + rng.uniform(0, steps * args.interval), rng.randint(1, args.coins),
+                    rng.uniform(-1, 1)) for _ in range(args.trades)]
+
+        replay_started = time.perf_counter()
+        result = run_backtest(store, trades)
+        elapsed = time.perf_counter() - replay_started
+
+    print('{:,} snapshots x {:,} coins ({:,} rows) replayed in {:.2f} s'.format(
+        len(result.times), args.coins, len(result.times) * args.coins, elapsed))
+    print('max drawdown {:.2%}, P&L {:,.2f}'.format(result.max_drawdown, result.contributions.sum()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# Benchmarks coindaemon.py against coinmock.py.
+# Starts the mock in this process (with --latency standing in for the trip to
+# upstream) and a daemon polling it in a child process, then:
+#
+#   reads   times single reads of the endpoints the scripts use, read from the
+#           daemon over a keep-alive connection and parsed, next to the same
+#           requests made straight to the mock
+#   fan-in  runs --clients copies of CoinPortfolio.py and CoinMarketCap.py at
+#           once, first straight against the mock and then with the daemon,
+#           and counts the upstream requests each way
+#
+#   python bench_daemon.py
+#   python bench_daemon.py --latency 0.1 --clients 8 --reads 2000
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import coinapi
+import coindaemon
+import coinlimit
+import coinmock
+from coinparse import loads
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+READ_PATHS = ['global/?convert=USD', 'global/?convert=EUR', 'ticker/1/?structure=array&convert=USD',
+              'ticker/?structure=array&start=1&limit=100&convert=USD']
+SCRIPTS = ['CoinPortfolio.py', 'CoinMarketCap.py']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def time_reads(read, count):
+    times = []
+    for _ in range(count):
+        started = time.perf_counter()
+        read()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def child_env(server, daemon_url, tmp):
+    return dict(os.environ,
+                COINMARKETCAP_API_URL=server.api_url,
+                COINMARKETCAP_DAEMON=daemon_url,
+                COINMARKETCAP_RATE_STATE=os.path.join(tmp, 'rate.bin'),
+                COINMARKETCAP_RATE_LIMIT='none',
+                PYTHONPATH=HERE + os.pathsep + os.environ.get('PYTHONPATH', ''))
+
+
+def fan_in(args, server, daemon_url, tmp):
+    # Upstream requests and wall time for --clients copies of each script at once.
+    env = child_env(server, daemon_url, tmp)
+    procs = []
+    server.reset()
+    started = time.perf_counter()
+    for client in range(args.clients):
+        workdir = os.path.join(tmp, ('daemon' if daemon_url else 'direct') + str(client))
+        os.makedirs(workdir)
+        with open(os.path.join(workdir, 'portfolio.txt'), 'w') as out:
+            for symbol in ['BTC', 'ETH', 'XRP'] + ['C' + str(rank) for rank in range(4, args.positions + 1)]:
+                out.write(symbol + ' 1.5\n')
+        for script in SCRIPTS:
+            procs.append(subprocess.Popen([sys.executable, os.path.join(HERE, script)], cwd=workdir, env=env,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE))
+    failed = [proc for proc in procs if proc.wait() != 0]
+    elapsed = time.perf_counter() - started
+    for proc in failed[:1]:
+        print('    failed: ' + proc.stderr.read().decode(errors='replace').strip().splitlines()[-1])
+    return elapsed, server.stats.get('requests', 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the local market-data daemon.')
+    parser.add_argument('--coins', type=int, default=2000, help='coins in the synthetic fixtures')
+    parser.add_argument('--daemon-coins', type=int, default=coindaemon.DAEMON_COINS, help='top coins the daemon polls')
+    parser.add_argument('--latency', type=float, default=0.05, help='mock upstream latency in seconds')
+    parser.add_argument('--reads', type=int, default=1000, help='reads per endpoint')
+    parser.add_argument('--clients', type=int, default=4, help='concurrent copies of each script')
+    parser.add_argument('--positions', type=int, default=20, help='holdings per portfolio')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = os.path.join(tmp, 'fixtures')
+        coinmock.generate_fixtures(fixtures, args.coins)
+        server = coinmock.start(coinmock.Fixtures(fixtures), latency=args.latency)
+        daemon_url = 'http://127.0.0.1:' + str(free_port()) + '/v2/'
+        daemon = subprocess.Popen([sys.executable, '-u', os.path.join(HERE, 'coindaemon.py'),
+                                   '--port', daemon_url.split(':')[2].split('/')[0],
+                                   '--coins', str(args.daemon_coins)],
+                                  cwd=tmp, env=child_env(server, '', tmp), stdout=subprocess.PIPE)
+        daemon.stdout.readline()   # printed once the first poll is in
+        client = coinapi.DaemonClient(daemon_url)
+        # the direct reads below measure upstream latency, not this process's request budget
+        coinlimit.set_limiter(coinlimit.RateLimiter(os.path.join(tmp, 'rate.bin'), requests_per_minute=None))
+        coinapi.set_daemon(None)
+        print('mock at ' + server.api_url + ' (latency ' + str(args.latency) + 's), daemon at ' + daemon_url
+              + ' polling ' + str(args.daemon_coins) + ' coins')
+
+        print('{:<55} {:>10} {:>10} {:>12}'.format('read', 'p50 (ms)', 'p99 (ms)', 'direct p50'))
+        for path in READ_PATHS:
+            client.get(path)   # builds the response once
+            times = time_reads(lambda: loads(client.get(path)[1]), args.reads)
+            direct = time_reads(lambda: coinapi.get_json(server.api_url + path), max(3, args.reads // 100))
+            print('{:<55} {:>10.3f} {:>10.3f} {:>12.1f}'.format(
+                path, statistics.median(times) * 1000, percentile(times, 0.99) * 1000,
+                statistics.median(direct) * 1000))
+
+        print()
+        print(str(args.clients) + ' x ' + ', '.join(SCRIPTS) + ' at once')
+        print('{:<10} {:>10} {:>20}'.format('mode', 'wall (s)', 'upstream requests'))
+        for mode, url in [('direct', ''), ('daemon', daemon_url)]:
+            elapsed, requests = fan_in(args, server, url, tmp)
+            print('{:<10} {:>10.2f} {:>20}'.format(mode, elapsed, requests))
+
+        daemon.terminate()
+        daemon.wait()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# Per-refresh cost of a full rebuild against a coindelta refresh, by churn.
+# Builds a --coins market from bench_parse's synthetic response, then for each
+# --churn fraction makes --refreshes listings in which that share of coins has
+# a new last_updated and price. Each refresh then does what Cointop100.py does
+# with a new listing, timed once over every coin and once through a
+# coindelta.DeltaCache:
+#
+#   table   format a table row per coin and lay the rows out in rank order
+#   store   append the listing to a coinstore.SnapshotStore
+#
+# Listings are built before timing, so parsing (which both pay) is left out.
+#
+#   python bench_delta.py --coins 5000 --churn 0 0.01 0.1 1
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+import coinparse
+from bench_parse import synthetic_response
+from coindelta import DeltaCache
+from coinrecord import MarketSnapshot
+from coinstore import SnapshotStore
+
+
+def table_row(coin):
+    # the cells Cointop100.py formats and caches for a coin; the rank is added when printing
+    return [coin.name + ' ( ' + coin.symbol + ')', '$' + str(coin.price), '$' + str(coin.market_cap),
+            '$' + '{:,}'.format(coin.volume_24h), str(coin.percent_change_1h) + '%',
+            str(coin.percent_change_24h) + '%', str(coin.percent_change_7d) + '%']
+
+
+def listings(market, churn, refreshes, seed=1):
+    # market followed by refreshes copies, each moving a churn share of its coins
+    rng = np.random.default_rng(seed)
+    array = market.array
+    result = [market]
+    for _ in range(refreshes):
+        array = array.copy()
+        moved = rng.random(len(array)) < churn
+        array['last_updated'][moved] += 300
+        array['price'][moved] *= np.exp(rng.normal(0, 0.01, int(moved.sum())))
+        result.append(MarketSnapshot(array, market.convert))
+    return result
+
+
+def full_refresh(snapshot, store):
+    rows = [[coin.rank] + table_row(coin) for coin in snapshot.sort('rank')]
+    store.append(snapshot)
+    return rows, len(snapshot)
+
+
+def delta_refresh(snapshot, store, cache):
+    changed = cache.update(snapshot)
+    ranked = snapshot.sort('rank')
+    rows = [[rank] + row for rank, row in zip(ranked.values('rank'), cache.ordered(ranked.column('id')))]
+    store.append(changed)
+    return rows, len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full and incremental refreshes of a coin listing.')
+    parser.add_argument('--coins', type=int, default=5000)
+    parser.add_argument('--churn', type=float, nargs='+', default=[0.0, 0.01, 0.1, 0.5, 1.0],
+                        help='share of coins whose last_updated moves each refresh')
+    parser.add_argument('--refreshes', type=int, default=20)
+    args = parser.parse_args()
+
+    market = MarketSnapshot.from_tickers(coinparse.slim_ticker(currency)
+                                         for currency in synthetic_response(args.coins)['data'])
+    print(str(args.refreshes) + ' refreshes of ' + '{:,}'.format(args.coins) + ' coins')
+    print('{:>8} {:>12} {:>12} {:>10} {:>14} {:>14}'.format('churn', 'full (ms)', 'delta (ms)', 'speedup',
+                                                            'rows stored', 'delta stored'))
+
+    for churn in args.churn:
+        snapshots = listings(market, churn, args.refreshes)
+        with tempfile.TemporaryDirectory() as full_dir, tempfile.TemporaryDirectory() as delta_dir:
+            full_store = SnapshotStore(full_dir)
+            delta_store = SnapshotStore(delta_dir)
+            cache = DeltaCache(table_row)
+            # the first listing fills both from nothing; only the refreshes after it are timed
+            full_refresh(snapshots[0], full_store)
+            delta_refresh(snapshots[0], delta_store, cache)
+
+            full_times, delta_times = [], []
+            full_rows = delta_rows = 0
+            for snapshot in snapshots[1:]:
+                started = time.perf_counter()
+                rows, stored = full_refresh(snapshot, full_store)
+                full_times.append(time.perf_counter() - started)
+                full_rows += stored
+
+                started = time.perf_counter()
+                delta_rows_out, stored = delta_refresh(snapshot, delta_store, cache)
+                delta_times.append(time.perf_counter() - started)
+                delta_rows += stored
+                if delta_rows_out != rows:
+                    print('{:>8}: delta table differs from the full rebuild'.format(churn))
+
+        full_ms = np.median(full_times) * 1000
+        delta_ms = np.median(delta_times) * 1000
+        print('{:>8.2f} {:>12.2f} {:>12.2f} {:>9.1f}x {:>14,} {:>14,}'.format(
+            churn, full_ms, delta_ms, full_ms / delta_ms, full_rows, delta_rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# Compares wall time and peak RSS of the coinexport formats.
+# Each format runs in its own child process on the same synthetic listing, so
+# the peak RSS reported for one format is not inflated by the others.
+#
+#   python bench_export.py --coins 10000 --formats csv parquet arrow xlsx
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from coinexport import EXTENSIONS, FORMATS
+
+
+def synthetic_pages(coins, page_size=100, convert='USD', seed=1):
+    # Ticker pages shaped like /v2/ticker/?structure=array, generated one page at a time.
+    rng = random.Random(seed)
+    for start in range(1, coins + 1, page_size):
+        page = []
+        for rank in range(start, min(start + page_size, coins + 1)):
+            price = rng.uniform(0.0001, 60000) / rank
+            page.append({
+                'id': rank,
+                'rank': rank,
+                'name': 'Coin ' + str(rank),
+                'symbol': 'C' + str(rank),
+                'quotes': {convert: {
+                    'price': price,
+                    'market_cap': price * rng.uniform(1e5, 1e9),
+                    'volume_24h': rng.uniform(0, 1e9),
+                    'percent_change_1h': round(rng.uniform(-5, 5), 2),
+                    'percent_change_24h': round(rng.uniform(-20, 20), 2) if rank % 13 else None,
+                    'percent_change_7d': round(rng.uniform(-50, 50), 2),
+                }},
+            })
+        yield page
+
+
+def run_one(fmt, coins, path):
+    # Child side: export and report wall time and peak RSS on stdout.
+    import resource
+    from coinexport import export
+
+    started = time.perf_counter()
+    export(synthetic_pages(coins), fmt, path)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    print(elapsed, peak, os.path.getsize(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare wall time and peak RSS of the coinexport formats.')
+    parser.add_argument('--coins', type=int, default=10000)
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--child', choices=FORMATS, help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(args.child, args.coins, args.path)
+        return
+
+    print('{:<8} {:>10} {:>14} {:>12}'.format('format', 'wall (s)', 'peak RSS (MB)', 'size (KB)'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.formats:
+            path = os.path.join(tmp, 'bench' + EXTENSIONS[fmt])
+            result = subprocess.run([sys.executable, __file__, '--child', fmt, '--coins', str(args.coins),
+                                     '--path', path], capture_output=True, text=True)
+            if result.returncode != 0:
+                print('{:<8} failed: {}'.format(fmt, result.stderr.strip().splitlines()[-1]))
+                continue
+            elapsed, peak, size = result.stdout.split()
+            print('{:<8} {:>10.3f} {:>14.1f} {:>12,}'.format(fmt, float(elapsed), int(peak) / 1024,
+                                                               int(size) // 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# Compares parse time and peak RSS for a large /v2/ticker/ response.
+# The response is written to a temporary file once; each mode then runs in its
+# own child process, so one mode's peak RSS is not inflated by another's.
+#
+#   dump    json.loads plus the old json.dumps(sort_keys, indent=4) debug print
+#   json    json.loads of the whole body
+#   orjson  orjson.loads of the whole body
+#   stream  coinparse.iter_tickers, which keeps only the fields the scripts read
+#
+#   python bench_parse.py --coins 20000
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ['dump', 'json', 'orjson', 'stream']
+
+
+def synthetic_response(coins, convert='USD', seed=1):
+    # A ticker response with every field the real endpoint returns.
+    rng = random.Random(seed)
+    data = []
+    for rank in range(1, coins + 1):
+        price = rng.uniform(0.0001, 60000) / rank
+        supply = rng.uniform(1e6, 1e10)
+        data.append({
+            'id': rank,
+            'name': 'Coin ' + str(rank),
+            'symbol': 'C' + str(rank),
+            'website_slug': 'coin-' + str(rank),
+            'rank': rank,
+            'circulating_supply': supply,
+            'total_supply': supply * rng.uniform(1, 2),
+            'max_supply': None if rank % 3 else supply * 2,
+            'quotes': {convert: {
+                'price': price,
+                'volume_24h': rng.uniform(0, 1e9),
+                'market_cap': price * supply,
+                'percent_change_1h': round(rng.uniform(-5, 5), 2),
+                'percent_change_24h': round(rng.uniform(-20, 20), 2),
+                'percent_change_7d': round(rng.uniform(-50, 50), 2),
+            }},
+            'last_updated': 1530000000 + rank,
+        })
+    return {'data': data, 'metadata': {'timestamp': 1530000000, 'num_cryptocurrencies': coins, 'error': None}}
+
+
+def run_one(mode, path):
+    # Child side: parse the file and report wall time, peak RSS and coins kept.
+    import resource
+    import coinparse
+
+    started = time.perf_counter()
+    if mode == 'stream':
+        with open(path, 'rb') as inp:
+            data = list(coinparse.iter_tickers(inp))
+    else:
+        with open(path, 'rb') as inp:
+            body = inp.read()
+        if mode == 'orjson':
+            import orjson
+            results = orjson.loads(body)
+        else:
+            results = json.loads(body)
+        if mode == 'dump':
+            with open(os.devnull, 'w') as out:
+                out.write(json.dumps(results, sort_keys=True, indent=4))
+        data = [coinparse.slim_ticker(currency) for currency in results['data']]
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    print(elapsed, peak, len(data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare parse time and peak RSS for a large ticker response.')
+    parser.add_argument('--coins', type=int, default=20000)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(args.child, args.path)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ticker.json')
+        with open(path, 'w') as out:
+            json.dump(synthetic_response(args.coins), out)
+        print(str(args.coins) + ' coins, ' + '{:,}'.format(os.path.getsize(path) // 1024) + ' KB response')
+        print('{:<8} {:>10} {:>14}'.format('mode', 'wall (s)', 'peak RSS (MB)'))
+        for mode in args.modes:
+            result = subprocess.run([sys.executable, __file__, '--child', mode, '--path', path],
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                print('{:<8} failed: {}'.format(mode, result.stderr.strip().splitlines()[-1]))
+                continue
+            elapsed, peak, kept = result.stdout.split()
+            print('{:<8} {:>10.3f} {:>14.1f}'.format(mode, float(elapsed), int(peak) / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Memory and sort cost of holding full-market snapshots in each form.
+# Builds --snapshots listings of --coins coins from a synthetic ticker response
+# (the same one bench_parse.py uses, parsed afresh each time so no strings are
+# shared between snapshots) and measures what they hold with tracemalloc,
+# which also sees NumPy's buffers. Build times include tracemalloc's own
+# overhead, so compare them only with each other.
+#
+#   dicts     the parsed response's data list, as json.loads gives it
+#   slim      coinparse.slim_ticker dicts, what streamed listings keep
+#   coins     a list of coinrecord.Coin records
+#   snapshot  coinrecord.MarketSnapshot, one structured array
+#
+# The sort column times a top-100-by-24h-change query over one snapshot.
+#
+#   python bench_records.py --coins 5000 --snapshots 10
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import coinparse
+from bench_parse import synthetic_response
+from coinrecord import Coin, MarketSnapshot
+
+FORMS = ['dicts', 'slim', 'coins', 'snapshot']
+
+
+def build(form, body):
+    data = json.loads(body)['data']
+    if form == 'dicts':
+        return data
+    data = [coinparse.slim_ticker(currency) for currency in data]
+    if form == 'slim':
+        return data
+    if form == 'coins':
+        return [Coin.from_ticker(currency) for currency in data]
+    return MarketSnapshot.from_tickers(data)
+
+
+def none_last(value):
+    return (1, 0) if value is None else (0, -value)
+
+
+def top_by_change(form, snapshot):
+    if form == 'snapshot':
+        return [coin.id for coin in snapshot.sort('percent_change_24h', descending=True).head(100)]
+    if form == 'coins':
+        ranked = sorted(snapshot, key=lambda coin: none_last(coin.percent_change_24h))
+        return [coin.id for coin in ranked[:100]]
+    ranked = sorted(snapshot, key=lambda currency: none_last(currency['quotes']['USD']['percent_change_24h']))
+    return [currency['id'] for currency in ranked[:100]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare memory use of ticker snapshot representations.')
+    parser.add_argument('--coins', type=int, default=5000)
+    parser.add_argument('--snapshots', type=int, default=10)
+    parser.add_argument('--forms', nargs='+', choices=FORMS, default=FORMS)
+    parser.add_argument('--repeat', type=int, default=20, help='sort timing repetitions')
+    args = parser.parse_args()
+
+    body = json.dumps(synthetic_response(args.coins))
+    print(str(args.snapshots) + ' snapshots of ' + '{:,}'.format(args.coins) + ' coins')
+    print('{:<10} {:>12} {:>12} {:>14} {:>12}'.format('form', 'held (MB)', 'build (s)', 'bytes/coin', 'sort (ms)'))
+
+    expected = None
+    for form in args.forms:
+        tracemalloc.start()
+        started = time.perf_counter()
+        snapshots = [build(form, body) for _ in range(args.snapshots)]
+        elapsed = time.perf_counter() - started
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            top = top_by_change(form, snapshots[0])
+        sort_ms = (time.perf_counter() - started) / args.repeat * 1000
+        if expected is None:
+            expected = top
+        elif top != expected:
+            print(form + ': top 100 differs from ' + args.forms[0])
+
+        print('{:<10} {:>12.1f} {:>12.3f} {:>14,.0f} {:>12.2f}'.format(
+            form, held / 1e6, elapsed, held / (args.coins * args.snapshots), sort_ms))
+        del snapshots
+
+
+if __name__ == '__main__':
+    main()
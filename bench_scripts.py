@@ -0,0 +1,159 @@
+# End-to-end benchmarks of the coin scripts against coinmock.py.
+# The mock runs in this process; every scenario runs the real script in a child
+# process with COINMARKETCAP_API_URL pointing at it, inside a fresh working
+# directory so listings.db, caches and snapshots start empty. Reports wall
+# time, upstream requests (and injected failures), and the child's peak RSS.
+# With --runs 2 the second run of each scenario shows the warm-cache numbers.
+#
+#   python bench_scripts.py
+#   python bench_scripts.py --coins 5000 --latency 0.05 --error-rate 0.02 --runs 2
+#   python bench_scripts.py --scenarios portfolio alerts
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import coinmock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = ['portfolio', 'top100', 'tickercoin', 'export', 'alerts']
+
+
+def alert_cycle(symbols):
+    # Child side of the alerts scenario: the Coincap2 loop, run until every
+    # symbol has been polled once. The loop's own request budget is lifted so the
+    # cycle measures fetching and checking; the shared budget still applies.
+    from coinalerts import AlertIndex, AlertScheduler, parse_alert
+    from coinapi import fetch_ticker
+    from coinindex import load_index
+
+    ticker_url_pairs = load_index()
+    alerts = AlertIndex()
+    for symbol in symbols:
+        alerts.add(parse_alert(symbol + ' above 1000000000'))
+        alerts.add(parse_alert(symbol + ' below 0.000000001'))
+
+    polled = set()
+
+    def fetch_currency(symbol):
+        return fetch_ticker(ticker_url_pairs[symbol])
+
+    def check_alerts(symbol, currency):
+        polled.add(symbol)
+        alerts.update(symbol, float(currency['quotes']['USD']['price']))
+
+    def threshold_distance(symbol, currency):
+        return alerts.distance(symbol, float(currency['quotes']['USD']['price']))
+
+    scheduler = AlertScheduler(fetch_currency, check_alerts, threshold_distance, requests_per_minute=None)
+    scheduler.set_symbols(alerts.symbols)
+    while len(polled) < len(alerts.symbols):
+        scheduler.step(max_wait=0.1)
+
+
+def scenario_command(name, args, workdir):
+    # (argv, stdin text) for one scenario, after writing whatever input files it needs.
+    symbols = ['BTC', 'ETH', 'XRP'] + ['C' + str(rank) for rank in range(4, args.positions + 1)]
+    if name == 'portfolio':
+        with open(os.path.join(workdir, 'portfolio.txt'), 'w') as out:
+            for symbol in symbols:
+                out.write(symbol + ' 1.5\n')
+        return [sys.executable, os.path.join(HERE, 'CoinPortfolio.py')], ''
+    if name == 'top100':
+        return [sys.executable, os.path.join(HERE, 'Cointop100.py')], '1\ny\n2\ny\n3\nn\n'
+    if name == 'tickercoin':
+        return ([sys.executable, os.path.join(HERE, 'Tickercoin.py')],
+                'y\n' + str(args.limit) + '\n1\nrank\nUSD\nn\n')
+    if name == 'export':
+        return ([sys.executable, os.path.join(HERE, 'generateexcelsheetscoin.py'), '--format', args.export_format,
+                 '--output', os.path.join(workdir, 'export.' + args.export_format)], '')
+    if name == 'alerts':
+        return [sys.executable, os.path.abspath(__file__), '--alert-cycle'] + symbols, ''
+    raise ValueError(name)
+
+
+def run_scenario(name, args, server, workdir):
+    argv, stdin = scenario_command(name, args, workdir)
+    env = dict(os.environ,
+               COINMARKETCAP_API_URL=server.api_url,
+               COINMARKETCAP_RATE_STATE=os.path.join(workdir, 'rate.bin'),
+               PYTHONPATH=HERE + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    # the scripts run under the default shared budget unless --rate-limit sets another
+    env.pop('COINMARKETCAP_RATE_LIMIT', None)
+    env.pop('COINMARKETCAP_RATE_BURST', None)
+    if args.rate_limit is not None:
+        env['COINMARKETCAP_RATE_LIMIT'] = str(args.rate_limit) if args.rate_limit else 'none'
+
+    server.reset()
+    started = time.perf_counter()
+    proc = subprocess.Popen(argv, cwd=workdir, env=env, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE)
+    proc.stdin.write(stdin.encode())
+    proc.stdin.close()
+    stderr = proc.stderr.read().decode(errors='replace')
+    _, status, usage = os.wait4(proc.pid, 0)
+    # decoded as subprocess does (os.waitstatus_to_exitcode needs Python 3.9)
+    proc.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    elapsed = time.perf_counter() - started
+
+    peak = usage.ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    error = stderr.strip().splitlines()[-1] if proc.returncode and stderr.strip() else None
+    return elapsed, dict(server.stats), peak, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the coin scripts against a local mock API.')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--fixtures', help='recorded fixtures directory (default: synthetic, see --coins)')
+    parser.add_argument('--coins', type=int, default=2000, help='coins in the synthetic fixtures')
+    parser.add_argument('--positions', type=int, default=50, help='holdings / alert symbols')
+    parser.add_argument('--limit', type=int, default=1000, help='Tickercoin custom limit')
+    parser.add_argument('--export-format', default='csv', help='generateexcelsheetscoin format')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--runs', type=int, default=1, help='runs per scenario in the same directory')
+    parser.add_argument('--rate-limit', type=float,
+                        help='shared request budget in requests a minute, 0 for none (default: coinlimit\'s)')
+    parser.add_argument('--alert-cycle', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.alert_cycle is not None:
+        alert_cycle(args.alert_cycle)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = args.fixtures
+        if fixtures is None:
+            fixtures = os.path.join(tmp, 'fixtures')
+            coinmock.generate_fixtures(fixtures, args.coins)
+        server = coinmock.start(coinmock.Fixtures(fixtures), latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, error_status=args.error_status, seed=1)
+        print('mock at ' + server.api_url + ', latency ' + str(args.latency) + 's, error rate '
+              + '{:.0%}'.format(args.error_rate))
+        print('{:<12} {:>4} {:>10} {:>9} {:>7} {:>11} {:>14}'.format(
+            'scenario', 'run', 'wall (s)', 'requests', 'errors', 'bytes (KB)', 'peak RSS (MB)'))
+        for name in args.scenarios:
+            workdir = os.path.join(tmp, name)
+            os.makedirs(workdir)
+            for run in range(1, args.runs + 1):
+                elapsed, stats, peak, error = run_scenario(name, args, server, workdir)
+                if error:
+                    print('{:<12} {:>4} failed: {}'.format(name, run, error))
+                    continue
+                print('{:<12} {:>4} {:>10.3f} {:>9} {:>7} {:>11,} {:>14.1f}'.format(
+                    name, run, elapsed, stats.get('requests', 0), stats.get('errors', 0),
+                    stats.get('bytes', 0) // 1024, peak / 1024))
+            shutil.rmtree(workdir, ignore_errors=True)
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
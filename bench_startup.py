@@ -0,0 +1,110 @@
+# Cold-start benchmark for the coin command line.
+# Starts coinmock.py in this process, runs each command once in a fresh working
+# directory to fill listings.db and the response and FX caches, then times
+# `python -m coinclient <command>` from process start to exit. Fails (exit 1)
+# when the median goes over STARTUP_BUDGET or when a warm command imports one
+# of HEAVY_MODULES, so a stray top-level import shows up here first.
+# --importtime prints the slowest imports of each command from -X importtime.
+#
+#   python bench_startup.py
+#   python bench_startup.py --runs 20 --budget 0.2 --importtime
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import coinmock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMMANDS = {
+    'listings': ['listings'],
+    'global': ['global'],
+    'global-eur': ['global', '--convert', 'EUR'],
+    'ticker': ['ticker', 'BTC'],
+}
+STARTUP_BUDGET = 0.2
+HEAVY_MODULES = ['requests', 'urllib3', 'numpy', 'colorama', 'xlsxwriter', 'pyarrow', 'concurrent.futures']
+
+
+def run(argv, workdir, env):
+    started = time.perf_counter()
+    proc = subprocess.run(argv, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - started
+    if proc.returncode:
+        raise RuntimeError(' '.join(argv[2:]) + ': ' + proc.stderr.decode(errors='replace').strip())
+    return elapsed, proc.stderr.decode(errors='replace')
+
+
+def import_times(stderr):
+    # [(cumulative microseconds, module)] from -X importtime output; nesting is kept as indentation.
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times.append((int(cumulative), name.rstrip()))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time cold starts of the coin command line.')
+    parser.add_argument('--commands', nargs='+', choices=list(COMMANDS), default=list(COMMANDS))
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--coins', type=int, default=2000, help='coins in the synthetic fixtures')
+    parser.add_argument('--budget', type=float, default=STARTUP_BUDGET, help='median seconds allowed per command')
+    parser.add_argument('--importtime', action='store_true', help='show the slowest imports of each command')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = os.path.join(tmp, 'fixtures')
+        coinmock.generate_fixtures(fixtures, args.coins)
+        server = coinmock.start(coinmock.Fixtures(fixtures))
+        workdir = os.path.join(tmp, 'work')
+        os.makedirs(workdir)
+        env = dict(os.environ,
+                   COINMARKETCAP_API_URL=server.api_url,
+                   COINMARKETCAP_RATE_STATE=os.path.join(workdir, 'rate.bin'),
+                   PYTHONPATH=HERE + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        env.pop('COINMARKETCAP_METRICS', None)
+
+        bare = min(run([sys.executable, '-c', 'pass'], workdir, env)[0] for _ in range(args.runs))
+        print('mock at ' + server.api_url + ', bare interpreter start {:.3f}s, budget {:.3f}s'.format(
+            bare, args.budget))
+        print('{:<12} {:>9} {:>9} {:>9} {:>9}  {}'.format(
+            'command', 'min (s)', 'median', 'max', 'requests', 'heavy imports'))
+
+        over = False
+        for name in args.commands:
+            argv = [sys.executable, '-m', 'coinclient'] + COMMANDS[name]
+            run(argv, workdir, env)   # fills the index and caches
+
+            server.reset()
+            times = [run(argv, workdir, env)[0] for _ in range(args.runs)]
+            requests = server.stats.get('requests', 0)
+
+            _, stderr = run([sys.executable, '-X', 'importtime'] + argv[1:], workdir, env)
+            imported = import_times(stderr)
+            modules = set(module.strip() for _, module in imported)
+            heavy = [module for module in HEAVY_MODULES if module in modules]
+
+            median = statistics.median(times)
+            over = over or median > args.budget or bool(heavy)
+            print('{:<12} {:>9.3f} {:>9.3f} {:>9.3f} {:>9}  {}'.format(
+                name, min(times), median, max(times), requests, ', '.join(heavy) or '-'))
+            if args.importtime:
+                for cumulative, module in sorted(imported, reverse=True)[:8]:
+                    print('    {:>8.1f} ms  {}'.format(cumulative / 1000, module))
+        server.shutdown()
+
+    if over:
+        print('over budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# Times cointable against PrettyTable on a full-market sized coin table.
+#
+#   python bench_table.py --rows 2000
+
+import argparse
+import random
+import time
+
+from colorama import Back, Style
+
+from cointable import Table
+
+HEADERS = ['Rank', 'Asset', 'Price', 'Market Cap', 'Volume', '1h', '24h', '7d']
+
+
+def coloured_change(change):
+    if change > 0:
+        return Back.GREEN + str(change) + '%' + Style.RESET_ALL
+    return Back.RED + str(change) + '%' + Style.RESET_ALL
+
+
+def sample_rows(count, seed=1):
+    rng = random.Random(seed)
+    rows = []
+    for rank in range(1, count + 1):
+        price = rng.uniform(0.0001, 60000) / rank
+        rows.append([rank,
+                     'Coin ' + str(rank) + ' (C' + str(rank) + ')',
+                     '$' + str(round(price, 6)),
+                     '$' + '{:,}'.format(round(price * rng.uniform(1e5, 1e9), 2)),
+                     '$' + '{:,}'.format(round(rng.uniform(0, 1e9), 2)),
+                     coloured_change(round(rng.uniform(-5, 5), 2)),
+                     coloured_change(round(rng.uniform(-20, 20), 2)),
+                     coloured_change(round(rng.uniform(-50, 50), 2))])
+    return rows
+
+
+def time_render(make_table, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        table = make_table(HEADERS)
+        for row in rows:
+            table.add_row(row)
+        str(table)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Table rendering benchmark')
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = sample_rows(args.rows)
+    print('cointable:   {:8.1f} ms'.format(time_render(Table, rows, args.repeat) * 1000))
+    try:
+        from prettytable import PrettyTable
+    except ImportError:
+        return
+    print('PrettyTable: {:8.1f} ms'.format(time_render(PrettyTable, rows, 1) * 1000))
+
+
+if __name__ == '__main__':
+    main()
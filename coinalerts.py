@@ -0,0 +1,330 @@
+# Price alert scheduling for Coincap2.py.
+# Symbols sit in a priority queue ordered by when they are next due. A symbol whose
+# price is close to one of its thresholds is polled more often than one far away,
+# alerts.txt is only re-read when it changes on disk, and every poll goes through
+# a request budget so the alert loop's own request rate stays under
+# REQUESTS_PER_MINUTE however many symbols sit near a threshold. Polls go through
+# coinapi as well, so they also count against the budget shared with the other
+# coin scripts in coinlimit.py.
+#
+# AlertIndex holds the alerts themselves: per symbol, the armed and disarmed
+# thresholds are kept sorted so a price update finds every crossed alert with a
+# bisect instead of a scan. Each alert re-arms on its own once the price moves
+# back past its threshold by its hysteresis; alerts without one fire only once.
+
+import bisect
+import heapq
+import itertools
+import os
+import time
+
+ALERTS_PATH = 'alerts.txt'
+REQUESTS_PER_MINUTE = 30
+MIN_INTERVAL = 15      # seconds between polls of a symbol sitting right on a threshold
+MAX_INTERVAL = 300     # seconds between polls of a symbol far from every threshold
+NEAR_DISTANCE = 0.10   # relative distance at which polling starts to speed up
+RETRY_INTERVAL = 60    # seconds before retrying a symbol whose fetch failed
+IDLE_WAIT = 5          # longest single sleep, so alerts.txt edits are noticed quickly
+
+
+class Alert:
+    __slots__ = ('symbol', 'direction', 'amount', 'threshold', 'rearm', 'armed')
+
+    def __init__(self, symbol, direction, amount, rearm=None):
+        self.symbol = symbol
+        self.direction = direction   # 'above' or 'below'
+        self.amount = amount         # threshold as written in alerts.txt
+        self.threshold = float(amount)
+        self.rearm = rearm           # hysteresis as a fraction of the threshold, None for one-shot
+        self.armed = True
+
+    def key(self):
+        return (self.symbol, self.direction, self.amount, self.rearm)
+
+    def rearm_level(self):
+        if self.direction == 'above':
+            return self.threshold * (1 - self.rearm)
+        return self.threshold * (1 + self.rearm)
+
+
+def parse_alert(line):
+    # 'TICKER amount'                        fires once when the price reaches amount
+    # 'TICKER above|below amount [rearm%]'   re-arms after moving rearm% back past amount
+    parts = line.split()
+    if len(parts) == 2:
+        return Alert(parts[0].upper(), 'above', parts[1])
+
+    ticker, direction, amount = parts[:3]
+    direction = direction.lower()
+    if direction not in ('above', 'below'):
+        raise ValueError('alert direction must be above or below: ' + line.strip())
+    rearm = None
+    if len(parts) > 3:
+        rearm = float(parts[3].rstrip('%')) / 100
+    return Alert(ticker.upper(), direction, amount, rearm)
+
+
+def read_alerts(path=ALERTS_PATH):
+    # One alert per line, in file order; blank lines and # comments are skipped.
+    alerts = []
+    with open(path) as inp:
+        for line in inp:
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            alerts.append(parse_alert(line))
+    return alerts
+
+
+class AlertsFile:
+    # Remembers the file's mtime and size so it is only parsed again after an edit.
+
+    def __init__(self, path=ALERTS_PATH):
+        self.path = path
+        self._stamp = None
+
+    def _current_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def changed(self):
+        return self._current_stamp() != self._stamp
+
+    def load(self):
+        self._stamp = self._current_stamp()
+        if self._stamp is None:
+            return []
+        return read_alerts(self.path)
+
+
+def poll_interval(distance, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, near_distance=NEAR_DISTANCE):
+    # distance is how far the price is from the nearest threshold, relative to that
+    # threshold; None means there is nothing left to watch for this symbol.
+    if distance is None:
+        return max_interval
+    closeness = min(1.0, abs(distance) / near_distance)
+    return min_interval + (max_interval - min_interval) * closeness
+
+
+class _SortedAlerts:
+    # Alerts kept in ascending key order. Everything that fires or re-arms on an
+    # update is arranged to sit at the tail, so taking it is a bisect plus a slice.
+
+    def __init__(self):
+        self.keys = []
+        self.alerts = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, alert):
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.alerts.insert(i, alert)
+
+    def take_from(self, key):
+        i = bisect.bisect_left(self.keys, key)
+        taken = self.alerts[i:]
+        del self.keys[i:]
+        del self.alerts[i:]
+        return taken
+
+    def last_key(self):
+        return self.keys[-1] if self.keys else None
+
+
+class SymbolAlerts:
+    # Armed 'above' alerts are keyed by -threshold, so the lowest thresholds (the
+    # first to be crossed on the way up) sit at the tail; armed 'below' alerts by
+    # threshold. Disarmed alerts are keyed the same way by their re-arm level.
+    # One-shot alerts that already fired are parked in spent.
+
+    def __init__(self):
+        self.above = _SortedAlerts()
+        self.below = _SortedAlerts()
+        self.above_rearm = _SortedAlerts()
+        self.below_rearm = _SortedAlerts()
+        self.spent = []
+
+    def __len__(self):
+        return (len(self.above) + len(self.below) + len(self.above_rearm) + len(self.below_rearm)
+                + len(self.spent))
+
+    def all_alerts(self):
+        return (self.above.alerts + self.below.alerts + self.above_rearm.alerts + self.below_rearm.alerts
+                + self.spent)
+
+    def add(self, alert):
+        if alert.armed:
+            self._arm(alert)
+        else:
+            self._disarm(alert)
+
+    def _arm(self, alert):
+        alert.armed = True
+        if alert.direction == 'above':
+            self.above.add(-alert.threshold, alert)
+        else:
+            self.below.add(alert.threshold, alert)
+
+    def _disarm(self, alert):
+        alert.armed = False
+        if alert.rearm is None:
+            self.spent.append(alert)
+        elif alert.direction == 'above':
+            self.above_rearm.add(alert.rearm_level(), alert)
+        else:
+            self.below_rearm.add(-alert.rearm_level(), alert)
+
+    def update(self, price):
+        # Returns every alert crossed by this price, then re-arms the ones the price
+        # has moved far enough back from.
+        hits = self.above.take_from(-price) + self.below.take_from(price)
+        for alert in self.above_rearm.take_from(price) + self.below_rearm.take_from(-price):
+            self._arm(alert)
+        for alert in hits:
+            self._disarm(alert)
+        return hits
+
+    def distance(self, price):
+        # Relative distance to the nearest armed threshold, None if nothing is armed.
+        distances = []
+        above = self.above.last_key()
+        if above is not None:
+            distances.append(abs(price + above) / -above if above else 0.0)
+        below = self.below.last_key()
+        if below is not None:
+            distances.append(abs(price - below) / below if below else 0.0)
+        return min(distances) if distances else None
+
+
+class AlertIndex:
+    # symbol -> SymbolAlerts, built from the list read_alerts returns.
+
+    def __init__(self, alerts=()):
+        self.symbols = {}
+        self.count = 0
+        for alert in alerts:
+            self.add(alert)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, alert):
+        self.symbols.setdefault(alert.symbol, SymbolAlerts()).add(alert)
+        self.count += 1
+
+    def update(self, symbol, price):
+        symbol_alerts = self.symbols.get(symbol)
+        if symbol_alerts is None:
+            return []
+        return symbol_alerts.update(price)
+
+    def distance(self, symbol, price):
+        symbol_alerts = self.symbols.get(symbol)
+        if symbol_alerts is None:
+            return None
+        return symbol_alerts.distance(price)
+
+    def replace(self, alerts):
+        # Builds the index for a re-read alerts.txt, carrying over the armed state
+        # of any alert that is unchanged so a reload does not fire it again.
+        states = {}
+        for symbol_alerts in self.symbols.values():
+            for alert in symbol_alerts.all_alerts():
+                states[alert.key()] = alert.armed
+        for alert in alerts:
+            alert.armed = states.get(alert.key(), True)
+        return AlertIndex(alerts)
+
+
+class RequestBudget:
+    # Spaces requests evenly so no more than requests_per_minute go out; None spaces nothing.
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, clock=time.monotonic):
+        self.spacing = 0.0 if requests_per_minute is None else 60.0 / requests_per_minute
+        self.clock = clock
+        self.next_allowed = clock()
+
+    def wait_time(self):
+        return max(0.0, self.next_allowed - self.clock())
+
+    def spend(self):
+        self.next_allowed = max(self.next_allowed, self.clock()) + self.spacing
+
+
+class AlertScheduler:
+    # fetch(symbol) returns the latest currency dict (or raises),
+    # on_update(symbol, currency) checks the alerts for it, and
+    # distance(symbol, currency) says how close it is to its nearest threshold.
+
+    def __init__(self, fetch, on_update, distance, requests_per_minute=REQUESTS_PER_MINUTE,
+                 min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, near_distance=NEAR_DISTANCE,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.fetch = fetch
+        self.on_update = on_update
+        self.distance = distance
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.near_distance = near_distance
+        self.clock = clock
+        self.sleep = sleep
+        self.budget = RequestBudget(requests_per_minute, clock)
+        self._queue = []
+        self._counter = itertools.count()
+        self._symbols = set()
+        self._live = {}   # symbol -> counter of its one live queue entry
+
+    def set_symbols(self, symbols):
+        # New symbols are due straight away; dropped ones fall out of the queue when
+        # popped. A symbol dropped and added back before its old entry pops gets a
+        # new entry, and the old one is stale.
+        symbols = set(symbols)
+        now = self.clock()
+        for symbol in self._symbols - symbols:
+            del self._live[symbol]
+        for symbol in symbols - self._symbols:
+            self.schedule(symbol, now)
+        self._symbols = symbols
+
+    def schedule(self, symbol, due):
+        # Replaces any entry symbol already has in the queue.
+        count = next(self._counter)
+        self._live[symbol] = count
+        heapq.heappush(self._queue, (due, count, symbol))
+
+    def next_due(self):
+        while self._queue and self._live.get(self._queue[0][2]) != self._queue[0][1]:
+            heapq.heappop(self._queue)
+        return self._queue[0][0] if self._queue else None
+
+    def step(self, max_wait=IDLE_WAIT):
+        # Waits for the next due symbol (at most max_wait seconds) and polls it.
+        # Returns the symbol that was polled, or None if nothing was due yet.
+        due = self.next_due()
+        if due is None:
+            self.sleep(max_wait)
+            return None
+
+        wait = max(due - self.clock(), self.budget.wait_time())
+        if wait > max_wait:
+            self.sleep(max_wait)
+            return None
+        if wait > 0:
+            self.sleep(wait)
+
+        due, _, symbol = heapq.heappop(self._queue)
+        self.budget.spend()
+        try:
+            currency = self.fetch(symbol)
+        except Exception:
+            self.schedule(symbol, self.clock() + RETRY_INTERVAL)
+            return symbol
+
+        self.on_update(symbol, currency)
+        interval = poll_interval(self.distance(symbol, currency),
+                                 self.min_interval, self.max_interval, self.near_distance)
+        self.schedule(symbol, self.clock() + interval)
+        return symbol
@@ -0,0 +1,406 @@
+# Shared CoinMarketCap v2 fetch helpers.
+# Keeps one pooled keep-alive session per process and fetches tickers concurrently.
+# Every request waits its turn on the shared cross-process rate limiter in
+# coinlimit.py and backs off with jitter on 429 and 5xx responses. Ticker lists
+# can be streamed through coinparse instead of parsed whole. With
+# COINMARKETCAP_METRICS set, every attempt is timed and counted in coinmetrics.
+# requests and the thread pool are only imported once they are needed, so
+# commands answered from local caches start quickly. When a coindaemon.py is
+# running at DAEMON_URL, requests for API_URL are read from it instead, over
+# one keep-alive connection per thread, outside the rate limiter.
+
+import io
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+import coinmetrics
+from coinlimit import MAX_RETRIES, RETRY_STATUSES, get_limiter, retry_after_seconds
+from coinparse import QUOTE_FIELDS, TICKER_FIELDS, iter_tickers, loads
+
+# COINMARKETCAP_API_URL points every script at another server, such as coinmock.py
+API_URL = os.environ.get('COINMARKETCAP_API_URL', 'https://api.coinmarketcap.com/v2/')
+MAX_WORKERS = 16
+TIMEOUT = 10
+PAGE_SIZE = 100
+PAGE_ATTEMPTS = 3
+BULK_MAX_RANK = 500
+# COINMARKETCAP_DAEMON= (empty) stops the scripts from looking for a coindaemon
+DAEMON_URL = os.environ.get('COINMARKETCAP_DAEMON', 'http://127.0.0.1:8766/v2/')
+DAEMON_PROBE_TIMEOUT = 0.2
+
+_session = None
+_session_lock = threading.Lock()
+_daemon = None   # DaemonClient once looked for, False when there is none
+_daemon_lock = threading.Lock()
+
+
+def request_error():
+    # requests' base exception, for except clauses; requests is loaded by then.
+    import requests
+    return requests.RequestException
+
+
+def get_session():
+    # One session for the whole process so connections are reused between calls.
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            if coinmetrics.ENABLED:
+                coinmetrics.instrument_adapter(adapter)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+    return _session
+
+
+class DaemonClient:
+    # Reads from a running coindaemon over one keep-alive connection per thread.
+
+    def __init__(self, url=DAEMON_URL, timeout=TIMEOUT):
+        from urllib.parse import urlsplit
+
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, path):
+        # (status, body) for an absolute path on the daemon. A keep-alive
+        # connection the daemon has dropped is reopened once.
+        import http.client
+
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection(self.host, self.port,
+                                                                                   timeout=self.timeout)
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+    def get(self, path):
+        # path is relative to the daemon's /v2/, such as 'global/?convert=EUR'
+        return self.request(self.prefix + path)
+
+    def status(self):
+        status, body = self.request('/daemon/status')
+        return loads(body) if status == 200 else None
+
+
+def find_daemon(url=DAEMON_URL):
+    # A DaemonClient when a coindaemon answers at url, otherwise None.
+    import http.client
+
+    if not url:
+        return None
+    try:
+        status = DaemonClient(url, timeout=DAEMON_PROBE_TIMEOUT).status()
+    except (OSError, http.client.HTTPException, ValueError):
+        return None
+    if not status or status.get('daemon') != 'coindaemon':
+        return None
+    return DaemonClient(url)
+
+
+def daemon():
+    # The running coindaemon's client, looked for on first use; False when there is none.
+    global _daemon
+    with _daemon_lock:
+        if _daemon is None:
+            _daemon = find_daemon() or False
+    return _daemon
+
+
+def set_daemon(client):
+    # Use client from now on, or never a daemon when client is None.
+    global _daemon
+    with _daemon_lock:
+        _daemon = client or False
+
+
+def daemon_body(url):
+    # The daemon's response body for an API_URL url; None when there is no
+    # daemon, or it has gone away, so the caller asks upstream instead.
+    if not url.startswith(API_URL):
+        return None
+    client = daemon()
+    if not client:
+        return None
+    import http.client
+
+    try:
+        status, body = client.get(url[len(API_URL):])
+    except (OSError, http.client.HTTPException):
+        set_daemon(None)
+        return None
+    if status != 200:
+        import requests
+        raise requests.HTTPError(str(status) + ' Error from coindaemon for url: ' + url)
+    return body
+
+
+class Snapshot:
+    # Holds whatever fetch() returned for ttl seconds; get() only calls fetch again
+    # once that copy has expired.
+
+    def __init__(self, fetch, ttl, clock=time.monotonic):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self.data = None
+        self.fetched_at = None
+
+    def age(self):
+        if self.fetched_at is None:
+            return None
+        return self.clock() - self.fetched_at
+
+    def expired(self):
+        return self.fetched_at is None or self.age() >= self.ttl
+
+    def get(self):
+        if self.expired():
+            self.data = self.fetch()
+            self.fetched_at = self.clock()
+        return self.data
+
+
+def record_attempt(url, response, waited, elapsed, stream):
+    name = coinmetrics.endpoint(url)
+    coinmetrics.observe('coin_rate_limit_wait_seconds', waited, endpoint=name)
+    coinmetrics.observe('coin_request_seconds', elapsed, endpoint=name)
+    coinmetrics.observe('coin_ttfb_seconds', response.elapsed.total_seconds(), endpoint=name)
+    coinmetrics.inc('coin_requests_total', endpoint=name, status=response.status_code)
+    if not stream:
+        coinmetrics.inc('coin_response_bytes_total', len(response.content), endpoint=name)
+    if response.status_code in RETRY_STATUSES:
+        coinmetrics.inc('coin_retries_total', endpoint=name)
+
+
+def request(url, headers=None, stream=False):
+    limiter = get_limiter()
+    for attempt in range(MAX_RETRIES + 1):
+        waited = limiter.acquire()
+        started = time.perf_counter()
+        response = get_session().get(url, headers=headers, timeout=TIMEOUT, stream=stream)
+        if coinmetrics.ENABLED:
+            record_attempt(url, response, waited, time.perf_counter() - started, stream)
+        if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            response.close()
+            limiter.backoff(attempt, retry_after_seconds(response))
+            continue
+        response.raise_for_status()
+        return response
+
+
+def parse(url, body):
+    if not coinmetrics.ENABLED:
+        return loads(body)
+    with coinmetrics.timer('coin_parse_seconds', endpoint=coinmetrics.endpoint(url)):
+        return loads(body)
+
+
+def get_json(url, cache=None):
+    # With a coincache.ResponseCache, fresh responses are answered locally and
+    # stale ones are revalidated with a conditional request. Anything the cache
+    # cannot answer comes from the daemon when one is running.
+    entry = None
+    if cache is not None:
+        entry = cache.lookup(url)
+        if entry is not None and entry.fresh():
+            coinmetrics.inc('coin_cache_lookups_total', result='hit')
+            return entry.data
+
+    body = daemon_body(url)
+    if body is not None:
+        return parse(url, body)
+    if cache is None:
+        return parse(url, request(url).content)
+
+    response = request(url, entry.validators() if entry is not None else None)
+    if response.status_code == 304 and entry is not None:
+        coinmetrics.inc('coin_cache_lookups_total', result='revalidated')
+        return cache.revalidated(url, entry, response)
+    coinmetrics.inc('coin_cache_lookups_total', result='miss')
+    return cache.store(url, response)
+
+
+def stream_tickers(url, convert='USD', fields=TICKER_FIELDS, quote_fields=QUOTE_FIELDS):
+    # Yields slim ticker dicts from a ticker list URL as the body arrives.
+    body = daemon_body(url)
+    if body is not None:
+        for currency in iter_tickers(io.BytesIO(body), convert, fields, quote_fields):
+            yield currency
+        return
+
+    response = request(url, stream=True)
+    started = time.perf_counter()
+    try:
+        response.raw.decode_content = True
+        for currency in iter_tickers(response.raw, convert, fields, quote_fields):
+            yield currency
+    finally:
+        if coinmetrics.ENABLED:
+            name = coinmetrics.endpoint(url)
+            coinmetrics.observe('coin_stream_seconds', time.perf_counter() - started, endpoint=name)
+            coinmetrics.inc('coin_response_bytes_total', response.raw.tell(), endpoint=name)
+        response.close()
+
+
+def ticker_url(coin_id, convert='USD'):
+    return API_URL + 'ticker/' + str(coin_id) + '/?structure=array&convert=' + convert
+
+
+def ticker_page_url(start, limit=PAGE_SIZE, convert='USD'):
+    return (API_URL + 'ticker/?structure=array&start=' + str(start) + '&limit=' + str(limit)
+            + '&convert=' + convert)
+
+
+def fetch_ticker(coin_id, convert='USD'):
+    results = get_json(ticker_url(coin_id, convert))
+    return results['data'][0]
+
+
+def fetch_tickers(coin_ids, convert='USD', max_workers=MAX_WORKERS):
+    # Returns one entry per id, in the same order as coin_ids.
+    # A failed fetch gives None for that id instead of aborting the whole batch.
+    def fetch(coin_id):
+        if coin_id is None:
+            return None
+        try:
+            return fetch_ticker(coin_id, convert)
+        except (request_error(), ValueError, KeyError, IndexError, TypeError):
+            return None
+
+    coin_ids = list(coin_ids)
+    if max_workers <= 1 or len(coin_ids) <= 1:
+        return [fetch(coin_id) for coin_id in coin_ids]
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(coin_ids))) as pool:
+        return list(pool.map(fetch, coin_ids))
+
+
+def get_ticker_page(start, convert='USD', limit=PAGE_SIZE, attempts=PAGE_ATTEMPTS):
+    # Tries a page up to attempts times (on top of request()'s own retries for
+    # throttling and server errors), then raises the last error.
+    for attempt in range(attempts):
+        try:
+            return get_json(ticker_page_url(start, limit, convert))['data'] or []
+        except (request_error(), ValueError, KeyError, TypeError):
+            if attempt == attempts - 1:
+                raise
+
+
+def fetch_ticker_page(start, convert='USD', limit=PAGE_SIZE):
+    # A failed page gives an empty list.
+    try:
+        return get_ticker_page(start, convert, limit, attempts=1)
+    except (request_error(), ValueError, KeyError, TypeError):
+        return []
+
+
+def fetch_ticker_pages(starts, convert='USD', max_workers=MAX_WORKERS, limit=PAGE_SIZE):
+    # One list of currencies per start, in order.
+    starts = list(starts)
+    if not starts:
+        return []
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(starts)))) as pool:
+        return list(pool.map(lambda start: fetch_ticker_page(start, convert, limit), starts))
+
+
+def iter_ticker_pages(starts, convert='USD', max_workers=MAX_WORKERS, limit=PAGE_SIZE, missing=None):
+    # Yields pages in order as they arrive, with at most max_workers pages in
+    # flight, so memory stays flat however long the listing is. A page that still
+    # fails after PAGE_ATTEMPTS tries raises its error, or, when a missing list is
+    # given, is skipped and its (first rank, last rank) appended to missing.
+    starts = iter(starts)
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        window = deque((start, pool.submit(get_ticker_page, start, convert, limit))
+                       for start in itertools.islice(starts, max_workers))
+        while window:
+            start, future = window.popleft()
+            for next_start in itertools.islice(starts, 1):
+                window.append((next_start, pool.submit(get_ticker_page, next_start, convert, limit)))
+            try:
+                page = future.result()
+            except (request_error(), ValueError, KeyError, TypeError):
+                if missing is None:
+                    raise
+                missing.append((start, start + limit - 1))
+                continue
+            yield page
+
+
+def fetch_global(convert='USD'):
+    return get_json(API_URL + 'global/?convert=' + convert)['data']
+
+
+def page_start(rank, limit=PAGE_SIZE):
+    return (rank - 1) // limit * limit + 1
+
+
+def fetch_tickers_bulk(coin_ids, convert='USD', ranks=None, max_rank=BULK_MAX_RANK,
+                       max_workers=MAX_WORKERS, limit=PAGE_SIZE):
+    # Same result shape as fetch_tickers, but pulls the ranked pages that cover the
+    # held ids and joins them by id, falling back to per-id calls for the rest.
+    # ranks maps id -> last known rank; ids with no known rank are looked for in
+    # the top max_rank coins. Returns (currencies, stats).
+    coin_ids = list(coin_ids)
+    ranks = ranks or {}
+    wanted = set(coin_id for coin_id in coin_ids if coin_id is not None)
+
+    starts = set()
+    for coin_id in wanted:
+        rank = ranks.get(coin_id)
+        if rank is None:
+            starts.update(range(1, max_rank + 1, limit))
+        elif rank <= max_rank:
+            starts.add(page_start(rank, limit))
+
+    # Paging only pays off if it needs fewer calls than asking for each id.
+    if len(starts) >= len(wanted):
+        starts = set()
+
+    by_id = {}
+    for page in fetch_ticker_pages(sorted(starts), convert, max_workers, limit):
+        for currency in page:
+            if currency['id'] in wanted:
+                by_id[currency['id']] = currency
+
+    missing = [coin_id for coin_id in wanted if coin_id not in by_id]
+    for coin_id, currency in zip(missing, fetch_tickers(missing, convert, max_workers)):
+        if currency is not None:
+            by_id[coin_id] = currency
+
+    # Pages can still miss coins (an unknown rank outside the top max_rank, or a
+    # rank that has moved), and their fallbacks can cost more than the paging
+    # saved; requests still shows the real count then, and saved stays at 0.
+    upstream_requests = len(starts) + len(missing)
+    stats = {
+        'ids': len(wanted),
+        'pages': len(starts),
+        'fallbacks': len(missing),
+        'requests': upstream_requests,
+        'saved': max(0, len(wanted) - upstream_requests),
+    }
+    return [by_id.get(coin_id) for coin_id in coin_ids], stats
@@ -0,0 +1,178 @@
+# Historical portfolio backtesting over recorded ticker snapshots.
+# Replays the snapshots in coinstore against a trade history and produces the
+# portfolio value at every snapshot, its drawdown, and how much each coin
+# contributed to the profit and loss. Starting holdings, and trades dated before
+# the first snapshot replayed, make up the opening position. Later trades settle
+# in cash at the price of the snapshot they land on, and the account starts with
+# just enough cash for every buy, so the value (holdings plus cash) only moves
+# with prices: a sale is not a loss and a buy is not a gain. Trades dated after
+# the last snapshot are not replayed and are handed back. Prices and holdings
+# are laid out as (snapshots x coins) matrices and processed a block of
+# CHUNK_STEPS snapshots at a time, so a year of 5-minute snapshots never has to
+# sit in memory at once.
+
+from datetime import datetime
+
+import numpy as np
+
+CHUNK_STEPS = 20000
+SEED_ROWS = 1000000
+
+
+def parse_time(text):
+    # Epoch seconds, or an ISO date / date-time in local time.
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def read_trades(path, index):
+    # 'TIME TICKER amount' per line, amount negative for sells. Plain 'TICKER amount'
+    # lines are starting holdings. Returns [(time or None, coin id, amount)] and the
+    # tickers the index does not know.
+    trades = []
+    unknown = []
+    with open(path) as inp:
+        for line in inp:
+            parts = line.split()
+            if not parts or parts[0].startswith('#'):
+                continue
+            if len(parts) == 2:
+                when, ticker, amount = None, parts[0], parts[1]
+            else:
+                when, ticker, amount = parse_time(parts[0]), parts[1], parts[2]
+            coin_id = index.get(ticker.upper())
+            if coin_id is None:
+                unknown.append(ticker.upper())
+                continue
+            trades.append((when, coin_id, float(amount)))
+    return trades, unknown
+
+
+def forward_fill(prices, carried):
+    # Fills NaN gaps down each column, starting from the carried row (the last
+    # known prices before this block).
+    stacked = np.vstack([carried, prices])
+    rows = np.where(np.isnan(stacked), 0, np.arange(len(stacked))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return stacked[rows, np.arange(stacked.shape[1])][1:]
+
+
+def prices_before(store, column_of, count, when, block_rows=SEED_ROWS):
+    # Each held coin's last recorded price before when, NaN if it has none. The
+    # scripts only store coins whose last_updated moved, so a coin can be absent
+    # from the first snapshots after a start time; this is what it carries in.
+    # Reads back from when a block of rows at a time until every coin is found.
+    columns = store.time_range(None, when, fields=['id', 'price'])
+    prices = np.full(count, np.nan)
+    found = np.zeros(count, dtype=bool)
+    end = len(columns['id'])
+    while end > 0 and not found.all():
+        begin = max(0, end - block_rows)
+        ids = np.asarray(columns['id'][begin:end])
+        held = (ids < len(column_of)) & (column_of[np.minimum(ids, len(column_of) - 1)] >= 0)
+        rows = np.flatnonzero(held)
+        last = np.full(count, -1, dtype=np.int64)
+        np.maximum.at(last, column_of[ids[rows]], rows)
+        new = (last >= 0) & ~found
+        prices[new] = np.asarray(columns['price'][begin:end])[last[new]]
+        found |= new
+        end = begin
+    return prices
+
+
+class BacktestResult:
+
+    def __init__(self, coin_ids, times, values, contributions, cash, before_range=(), after_range=()):
+        self.coin_ids = coin_ids
+        self.times = times
+        self.values = values                 # holdings plus cash at every snapshot
+        self.contributions = contributions   # P&L per coin, same order as coin_ids
+        self.cash = cash
+        # trades dated before the first snapshot (counted in the opening position)
+        # and after the last (not replayed)
+        self.before_range = list(before_range)
+        self.after_range = list(after_range)
+        peaks = np.maximum.accumulate(values) if len(values) else values
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.drawdown = np.where(peaks > 0, values / peaks - 1, 0.0)
+        self.max_drawdown = float(self.drawdown.min()) if len(values) else 0.0
+
+
+def run_backtest(store, trades, start=None, end=None, chunk_steps=CHUNK_STEPS):
+    coin_ids = sorted(set(coin_id for when, coin_id, amount in trades))
+    columns = store.time_range(start, end, fields=['fetched_at', 'id', 'price'])
+    fetched_at = columns['fetched_at']
+    if not coin_ids or not len(fetched_at):
+        return BacktestResult(coin_ids, np.empty(0), np.empty(0), np.zeros(len(coin_ids)), np.empty(0),
+                              after_range=[trade for trade in trades if trade[0] is not None])
+
+    # one step per fetch: rows sharing a fetched_at value belong to the same snapshot
+    step_starts = np.flatnonzero(np.r_[True, fetched_at[1:] != fetched_at[:-1]])
+    times = np.asarray(fetched_at[step_starts])
+    step_ends = np.r_[step_starts[1:], len(fetched_at)]
+
+    # id -> column, as a dense lookup so a whole block of ids maps in one gather
+    column_of = np.full(max(coin_ids) + 1, -1, dtype=np.int64)
+    column_of[coin_ids] = np.arange(len(coin_ids))
+
+    # trades land on the first snapshot at or after them; starting holdings on step 0.
+    # Trades after the last snapshot get step len(times), which no block reaches.
+    trade_steps = np.array([0 if when is None else np.searchsorted(times, when, side='left')
+                            for when, coin_id, amount in trades], dtype=np.int64)
+    trade_columns = column_of[[coin_id for when, coin_id, amount in trades]]
+    trade_amounts = np.array([amount for when, coin_id, amount in trades], dtype=np.float64)
+    # only trades inside the replay move cash; the rest are the opening position
+    settled = np.array([when is not None and when >= times[0] for when, coin_id, amount in trades], dtype=bool)
+    before_range = [trade for trade in trades if trade[0] is not None and trade[0] < times[0]]
+    after_range = [trade for trade, step in zip(trades, trade_steps) if step == len(times)]
+
+    values = np.empty(len(times))
+    cash = np.empty(len(times))
+    contributions = np.zeros(len(coin_ids))
+    if start is None:
+        carried_prices = np.full(len(coin_ids), np.nan)
+    else:
+        carried_prices = prices_before(store, column_of, len(coin_ids), start)
+    carried_holdings = np.zeros(len(coin_ids))
+    carried_cash = 0.0
+
+    for first in range(0, len(times), chunk_steps):
+        last = min(first + chunk_steps, len(times))
+        rows = slice(step_starts[first], step_ends[last - 1])
+
+        ids = np.asarray(columns['id'][rows])
+        held = (ids < len(column_of)) & (column_of[np.minimum(ids, len(column_of) - 1)] >= 0)
+        row_steps = np.repeat(np.arange(last - first), step_ends[first:last] - step_starts[first:last])[held]
+        prices = np.full((last - first, len(coin_ids)), np.nan)
+        prices[row_steps, column_of[ids[held]]] = np.asarray(columns['price'][rows])[held]
+        prices = forward_fill(prices, carried_prices)
+
+        deltas = np.zeros((last - first, len(coin_ids)))
+        in_block = (trade_steps >= first) & (trade_steps < last)
+        np.add.at(deltas, (trade_steps[in_block] - first, trade_columns[in_block]), trade_amounts[in_block])
+        holdings = carried_holdings + np.cumsum(deltas, axis=0)
+
+        known_prices = np.nan_to_num(prices)
+        paid = in_block & settled
+        cash_deltas = np.zeros(last - first)
+        np.add.at(cash_deltas, trade_steps[paid] - first,
+                  -trade_amounts[paid] * known_prices[trade_steps[paid] - first, trade_columns[paid]])
+        cash[first:last] = carried_cash + np.cumsum(cash_deltas)
+        values[first:last] = (holdings * known_prices).sum(axis=1) + cash[first:last]
+
+        # P&L per coin: what was held going into each step times that step's price move
+        previous_prices = np.vstack([carried_prices, prices[:-1]])
+        previous_holdings = np.vstack([carried_holdings, holdings[:-1]])
+        contributions += np.nan_to_num(previous_holdings * (prices - previous_prices)).sum(axis=0)
+
+        carried_prices = prices[-1]
+        carried_holdings = holdings[-1]
+        carried_cash = cash[last - 1]
+
+    # the opening cash is whatever the buys took the balance below zero by
+    opening_cash = max(0.0, -float(cash.min()))
+    cash += opening_cash
+    values += opening_cash
+    return BacktestResult(coin_ids, times, values, contributions, cash, before_range, after_range)
@@ -0,0 +1,152 @@
+# HTTP response cache for the CoinMarketCap JSON endpoints.
+# Responses are keyed by a normalized URL (lower-case host, sorted query) and
+# kept both in memory, as already-parsed JSON, and on disk in SQLite so later
+# runs can reuse them. A response is served locally while it is fresh (its
+# Cache-Control max-age, or DEFAULT_TTL); once stale it is revalidated with
+# If-None-Match / If-Modified-Since, and a 304 just extends its freshness.
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from coinparse import loads
+
+CACHE_PATH = 'http_cache.db'
+DEFAULT_TTL = 60
+MEMORY_ENTRIES = 1024
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+'''
+
+
+def normalize_url(url):
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    path = parts.path or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+def freshness(response, default_ttl):
+    # max-age from Cache-Control if the server sent one, otherwise default_ttl.
+    for directive in response.headers.get('Cache-Control', '').split(','):
+        name, _, value = directive.strip().partition('=')
+        if name.lower() in ('no-store', 'no-cache'):
+            return 0
+        if name.lower() == 'max-age':
+            try:
+                return max(0, int(value))
+            except ValueError:
+                pass
+    return default_ttl
+
+
+class CacheEntry:
+    __slots__ = ('data', 'body', 'expires_at', 'etag', 'last_modified')
+
+    def __init__(self, data, body, expires_at, etag=None, last_modified=None):
+        self.data = data
+        self.body = body
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def fresh(self, now=None):
+        return (time.time() if now is None else now) < self.expires_at
+
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+
+    def __init__(self, path=CACHE_PATH, ttl=DEFAULT_TTL, memory_entries=MEMORY_ENTRIES):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'revalidated': 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def lookup(self, url):
+        # The cached entry for url (fresh or stale), or None. Counts a hit only when
+        # the entry is fresh enough to be used without asking upstream.
+        key = normalize_url(url)
+        with self._lock:
+            entry = self.memory.get(key)
+            source = 'memory_hits'
+            if entry is None and self._conn is not None:
+                row = self._conn.execute('SELECT body, expires_at, etag, last_modified FROM responses WHERE key = ?',
+                                         (key,)).fetchone()
+                if row is not None:
+                    entry = CacheEntry(loads(row[0]), row[0], row[1], row[2], row[3])
+                    self._remember(key, entry)
+                    source = 'disk_hits'
+            if entry is not None and entry.fresh():
+                self.stats['hits'] += 1
+                self.stats[source] += 1
+            else:
+                self.stats['misses'] += 1
+            if entry is not None:
+                self.memory.move_to_end(key)
+        return entry
+
+    def store(self, url, response):
+        # Caches a 200 response and returns its parsed JSON.
+        body = response.content
+        data = loads(body)
+        ttl = freshness(response, self.ttl)
+        entry = CacheEntry(data, body, time.time() + ttl, response.headers.get('ETag'),
+                           response.headers.get('Last-Modified'))
+        self._save(normalize_url(url), entry)
+        return data
+
+    def revalidated(self, url, entry, response):
+        # Upstream said 304 Not Modified: keep the body, extend its freshness.
+        entry.expires_at = time.time() + freshness(response, self.ttl)
+        entry.etag = response.headers.get('ETag', entry.etag)
+        entry.last_modified = response.headers.get('Last-Modified', entry.last_modified)
+        with self._lock:
+            self.stats['revalidated'] += 1
+        self._save(normalize_url(url), entry)
+        return entry.data
+
+    def _save(self, key, entry):
+        with self._lock:
+            self._remember(key, entry)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                                       (key, entry.body, entry.expires_at, entry.etag, entry.last_modified))
+
+    def hit_ratio(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def summary(self):
+        return ('Cache: ' + str(self.stats['hits']) + ' hits (' + str(self.stats['memory_hits']) + ' memory, '
+                + str(self.stats['disk_hits']) + ' disk), ' + str(self.stats['misses']) + ' misses, '
+                + str(self.stats['revalidated']) + ' revalidated, '
+                + '{:.0%}'.format(self.hit_ratio()) + ' hit ratio')
@@ -0,0 +1,20 @@
+# Importable client for the coin scripts.
+# The functions in coinclient.client are re-exported here lazily: importing
+# coinclient costs next to nothing, and the fetch helpers (and requests behind
+# them) load on first use. The command line lives in coinclient.cli.
+#
+#   import coinclient
+#   coinclient.global_data('EUR')['quotes']['EUR']['total_market_cap']
+
+__all__ = ['listings', 'global_data', 'ticker', 'suggest', 'top', 'read_positions', 'portfolio', 'export']
+
+
+def __getattr__(name):
+    if name in __all__:
+        from coinclient import client
+        return getattr(client, name)
+    raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,3 @@
+from coinclient.cli import main
+
+main()
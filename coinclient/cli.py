@@ -0,0 +1,153 @@
+# The coin command line: one entry point per script behaviour.
+#
+#   coin listings                      every listed coin, from the local index
+#   coin global [--convert EUR]        global market cap and volume
+#   coin ticker BTC [ETH ...]          one coin's details
+#   coin top [--sort change]           the top 100 as a table
+#   coin portfolio [--file PATH]       value of the holdings in portfolio.txt
+#   coin export --format csv           every coin to a spreadsheet or data file
+#
+# The text each command prints is built by coinclient.views, which the scripts
+# use too. Only argparse and coinclient.client (which imports nothing itself)
+# load up front; each command imports what it needs, so `coin listings` and
+# `coin global` never load colorama, numpy or the exporters.
+
+import argparse
+import sys
+
+from coinclient import client
+
+
+def run_listings(args, out):
+    for currency in client.listings():
+        out.write(str(currency['id']) + ': ' + currency['name'] + ' (' + currency['symbol'] + ')\n')
+
+
+def run_global(args, out):
+    from coinclient import views
+
+    for line in views.global_lines(client.global_data(args.convert), args.convert):
+        out.write(line + '\n')
+
+
+def run_ticker(args, out):
+    from coinclient import views
+
+    status = 0
+    for symbol in args.symbols:
+        try:
+            currency = client.ticker(symbol, args.convert)
+        except KeyError:
+            suggestions = client.suggest(symbol)
+            out.write('No coin called ' + symbol.upper() + '.'
+                      + (' Did you mean: ' + ', '.join(match['symbol'] + ' (' + match['name'] + ')'
+                                                      for match in suggestions) if suggestions else '') + '\n\n')
+            status = 1
+            continue
+        out.write(str(currency['rank']) + ': ' + views.ticker_block(currency, args.convert) + '\n')
+    return status
+
+
+def run_top(args, out):
+    from coinclient import views
+    from cointable import Table, print_table
+
+    table = Table(views.TOP_HEADERS)
+    for currency in client.top(args.limit, args.sort, args.convert):
+        table.add_row([currency['rank']] + views.top_cells(currency, args.convert))
+    print_table(table, args.page_size, out)
+
+
+def run_portfolio(args, out):
+    from coinclient import views
+    from cointable import print_table
+
+    holdings = client.portfolio(client.read_positions(args.file), args.convert)
+    table, portfolio_value, last_updated, failed = views.portfolio_table(holdings, args.convert)
+    out.write('\nMY PORTFOLIO\n\n')
+    print_table(table, args.page_size, out)
+    for line in views.portfolio_summary(portfolio_value, last_updated, failed):
+        out.write(line + '\n')
+    return 1 if failed else 0
+
+
+def run_export(args, out):
+    from coinexport import EXTENSIONS
+
+    output = args.output or 'cryptocurrencies' + EXTENSIONS[args.format]
+    missing = []
+    rows = client.export(args.format, output, args.convert, missing=missing)
+    out.write('Wrote ' + '{:,}'.format(rows) + ' coins to ' + output + '\n')
+    if missing:
+        out.write('Could not fetch ranks ' + ', '.join(str(first) + '-' + str(last) for first, last in missing)
+                  + '; those coins are missing from ' + output + '\n')
+        return 1
+    return 0
+
+
+RUNNERS = {
+    'listings': run_listings,
+    'global': run_global,
+    'ticker': run_ticker,
+    'top': run_top,
+    'portfolio': run_portfolio,
+    'export': run_export,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='coin', description='CoinMarketCap command line client.')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    commands.add_parser('listings', help='every listed coin')
+
+    command = commands.add_parser('global', help='global market cap and volume')
+    command.add_argument('--convert', default='USD', type=str.upper)
+
+    command = commands.add_parser('ticker', help="one or more coins' details")
+    command.add_argument('symbols', nargs='+', metavar='SYMBOL')
+    command.add_argument('--convert', default='USD', type=str.upper)
+
+    command = commands.add_parser('top', help='the top coins as a table')
+    command.add_argument('--limit', type=int, default=100)
+    command.add_argument('--sort', choices=client.SORTS, default='rank')
+    command.add_argument('--convert', default='USD', type=str.upper)
+    command.add_argument('--page-size', type=int, help='rows per screen on a terminal')
+
+    command = commands.add_parser('portfolio', help='value of a portfolio file')
+    command.add_argument('--file', default='portfolio.txt', help='TICKER amount per line (default: portfolio.txt)')
+    command.add_argument('--convert', default='USD', type=str.upper)
+    command.add_argument('--page-size', type=int, help='rows per screen on a terminal')
+
+    command = commands.add_parser('export', help='every coin to a spreadsheet or data file')
+    command.add_argument('--format', choices=['xlsx', 'csv', 'parquet', 'arrow'], default='xlsx')
+    command.add_argument('--output', help='output path (default: cryptocurrencies.<format>)')
+    command.add_argument('--convert', default='USD', type=str.upper)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        status = RUNNERS[args.command](args, sys.stdout)
+    except BrokenPipeError:
+        # piped into head and the reader went away
+        status = 0
+    sys.exit(status or 0)
+
+
+def command_main(command):
+    # console entry point for a single command: `coin-global --convert EUR`
+    def run():
+        main([command] + sys.argv[1:])
+    run.__name__ = command.replace('-', '_') + '_main'
+    return run
+
+
+listings_main = command_main('listings')
+global_main = command_main('global')
+ticker_main = command_main('ticker')
+top_main = command_main('top')
+portfolio_main = command_main('portfolio')
+export_main = command_main('export')
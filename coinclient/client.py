@@ -0,0 +1,102 @@
+# What the coin scripts do, as functions that return data instead of printing.
+# Each function imports the modules it needs when it is called, so a command
+# only pays for what it uses. Ticker and global data are fetched in coinfx.BASE
+# through the response cache and converted locally, as Tickercoin does.
+
+CACHE_TTL = 60
+# sort name -> (coinrecord.MarketSnapshot field, descending); Cointop100's menu uses the same orders
+SORT_FIELDS = {
+    'rank': ('rank', False),
+    'change': ('percent_change_24h', True),
+    'volume': ('volume_24h', True),
+}
+SORTS = list(SORT_FIELDS)
+
+
+def _cache(ttl=CACHE_TTL):
+    from coincache import ResponseCache
+    return ResponseCache(ttl=ttl)
+
+
+def listings():
+    # Every listed coin (id, name, symbol, website_slug) from the local index.
+    from coinindex import load_index
+    return load_index().listings()
+
+
+def global_data(convert='USD', cache_ttl=CACHE_TTL):
+    from coinapi import API_URL, get_json
+    from coinfx import BASE, FxRates
+
+    data = get_json(API_URL + 'global/?convert=' + BASE, cache=_cache(cache_ttl))['data']
+    return FxRates().localize(data, convert)
+
+
+def suggest(text):
+    # Listings whose symbol or name starts with, or nearly matches, text.
+    from coinsearch import SearchIndex
+    return SearchIndex(listings()).suggest(text)
+
+
+def ticker(symbol, convert='USD', cache_ttl=CACHE_TTL):
+    # The ticker for a symbol or coin name; KeyError if neither is listed.
+    from coinapi import get_json, ticker_url
+    from coinfx import BASE, FxRates
+    from coinindex import load_index
+
+    index = load_index()
+    coin_id = index.get(symbol.upper())
+    if coin_id is None:
+        from coinsearch import SearchIndex
+        matches = SearchIndex(index.listings()).exact(symbol)
+        if not matches:
+            raise KeyError(symbol)
+        coin_id = matches[0]['id']
+    currency = get_json(ticker_url(coin_id, BASE), cache=_cache(cache_ttl))['data'][0]
+    return FxRates().localize(currency, convert)
+
+
+def top(limit=100, sort='rank', convert='USD', cache_ttl=CACHE_TTL):
+    # The top `limit` coins by rank, re-sorted by one of SORT_FIELDS (missing values last).
+    from coinapi import API_URL, get_json
+    from coinfx import BASE, FxRates
+    from coinrecord import MarketSnapshot
+
+    url = API_URL + 'ticker/?structure=array&sort=rank&limit=' + str(limit) + '&convert=' + BASE
+    snapshot = MarketSnapshot.from_tickers(get_json(url, cache=_cache(cache_ttl))['data'], BASE)
+    return FxRates().localize_snapshot(snapshot, convert).sort(*SORT_FIELDS[sort]).to_tickers()
+
+
+def read_positions(path='portfolio.txt'):
+    # [(TICKER, amount string)] from 'TICKER amount' lines.
+    positions = []
+    with open(path) as inp:
+        for line in inp:
+            if not line.strip():
+                continue
+            ticker, amount = line.split()
+            positions.append((ticker.upper(), amount))
+    return positions
+
+
+def portfolio(positions, convert='USD'):
+    # [(ticker, amount, ticker dict or None)] for each position, fetched concurrently.
+    from coinapi import fetch_tickers
+    from coinfx import BASE, FxRates
+    from coinindex import load_index
+
+    index = load_index()
+    currencies = fetch_tickers([index.get(ticker) for ticker, amount in positions], BASE)
+    FxRates().localize_all(currencies, convert)
+    return [(ticker, amount, currency) for (ticker, amount), currency in zip(positions, currencies)]
+
+
+def export(fmt, output, convert='USD', max_workers=8, missing=None):
+    # Writes every listed coin to output; returns the number of rows written.
+    # Pages that cannot be fetched raise, or go into missing as in iter_ticker_pages.
+    from coinapi import PAGE_SIZE, fetch_global, iter_ticker_pages
+    from coinexport import export as export_pages
+
+    total = fetch_global(convert)['active_cryptocurrencies']
+    starts = range(1, total + 1, PAGE_SIZE)
+    return export_pages(iter_ticker_pages(starts, convert, max_workers, missing=missing), fmt, output, convert)
@@ -0,0 +1,119 @@
+# What the coin scripts and the coin command line print, built in one place.
+# Every builder takes ticker dicts with their quotes under quotes[convert], as
+# coinapi returns them and coinrecord.Coin.to_ticker() gives them back, and
+# returns lines, a block of text or table cells; writing them out is left to
+# the caller. colorama and cointable are imported by the builders that need
+# them, so `coin ticker` and `coin global` stay light.
+
+from datetime import datetime
+
+TOP_HEADERS = ['Rank', 'Asset', 'Price', 'Market Cap', 'Volume', '1h', '24h', '7d']
+
+
+def colour_change(change):
+    from colorama import Back, Style
+
+    if change is None:
+        return str(change)
+    if change > 0:
+        return Back.GREEN + str(change) + '%' + Style.RESET_ALL
+    return Back.RED + str(change) + '%' + Style.RESET_ALL
+
+
+def number_string(value):
+    return 'n/a' if value is None else '{:,}'.format(value)
+
+
+def updated_string(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%B %d, %Y at %I:%M%p')
+
+
+def global_lines(data, convert):
+    # The global market summary CoinMarketCap.py prints.
+    quotes = data['quotes'][convert]
+    return ['',
+            'There are currently ' + '{:,}'.format(data['active_cryptocurrencies']) + ' active cryptocurrecies and '
+            + '{:,}'.format(data['active_markets']) + ' active markets.',
+            'The global cap of all cryptos is ' + '{:,}'.format(int(quotes['total_market_cap']))
+            + ' and the 24h global volume is ' + '{:,}'.format(int(quotes['total_volume_24h'])) + '.',
+            'Bitcoin\'s total percentage of the global cap is ' + str(data['bitcoin_percentage_of_market_cap']) + '%.',
+            '',
+            'This information was last updated on ' + updated_string(data['last_updated']) + '.']
+
+
+def ticker_block(currency, convert):
+    # One coin's details, ending in a blank line. The leading 'rank: ' is left to
+    # the caller, since a coin's rank moves when other coins pass it.
+    quotes = currency['quotes'][convert]
+    circulating_supply = currency['circulating_supply']
+    total_supply = currency['total_supply']
+    lines = [currency['name'] + ' (' + currency['symbol'] + ')',
+             'Market cap: \t\t$' + number_string(quotes['market_cap']),
+             'Price: \t\t\t$' + str(quotes['price']),
+             '24h Volume: \t\t$' + number_string(quotes['volume_24h']),
+             'Hour change: \t\t' + str(quotes['percent_change_1h']) + '%',
+             'Day change: \t\t' + str(quotes['percent_change_24h']) + '%',
+             'Week change: \t\t' + str(quotes['percent_change_7d']) + '%',
+             'Total supply: \t\t' + number_string(total_supply and int(total_supply)),
+             'Circulating supply: \t' + number_string(circulating_supply and int(circulating_supply))]
+    if circulating_supply and total_supply:
+        lines.append('Percentage of coins in circulation: ' + str(int(circulating_supply / total_supply * 100)))
+    return '\n'.join(lines + [''])
+
+
+def top_cells(currency, convert):
+    # A row of the top coins table (TOP_HEADERS) without its leading rank.
+    quotes = currency['quotes'][convert]
+    return [currency['name'] + ' ( ' + currency['symbol'] + ')',
+            '$' + str(quotes['price']),
+            '$' + str(quotes['market_cap']),
+            '$' + number_string(quotes['volume_24h']),
+            colour_change(quotes['percent_change_1h']),
+            colour_change(quotes['percent_change_24h']),
+            colour_change(quotes['percent_change_7d'])]
+
+
+def portfolio_table(holdings, convert):
+    # holdings: [(ticker, amount string, ticker dict or None)].
+    # Returns (table, total value, latest last_updated or 0 if none, tickers that could not be fetched).
+    from cointable import Table
+
+    table = Table(['Asset', 'Amount Owned', convert + ' Value', 'Price', '1h', '24h', '7d'])
+    portfolio_value = 0.0
+    last_updated = 0
+    failed = []
+    for ticker, amount, currency in holdings:
+        if currency is None:
+            failed.append(ticker)
+            continue
+        quotes = currency['quotes'][convert]
+        value = float(quotes['price']) * float(amount)
+        portfolio_value += value
+        last_updated = max(last_updated, currency['last_updated'] or 0)
+        table.add_row([currency['name'] + ' (' + currency['symbol'] + ')',
+                       amount,
+                       '$' + '{:,}'.format(round(value, 2)),
+                       '$' + str(quotes['price']),
+                       colour_change(quotes['percent_change_1h']),
+                       colour_change(quotes['percent_change_24h']),
+                       colour_change(quotes['percent_change_7d'])])
+    return table, portfolio_value, last_updated, failed
+
+
+def portfolio_summary(portfolio_value, last_updated, failed, bulk_stats=None):
+    # The lines printed under the portfolio table. There is no update time to show
+    # when every ticker failed.
+    from colorama import Back, Style
+
+    lines = ['']
+    if failed:
+        lines += ['Could not fetch: ' + ', '.join(failed), '']
+    if bulk_stats is not None:
+        lines += ['Bulk mode: ' + str(bulk_stats['requests']) + ' upstream requests for ' + str(bulk_stats['ids'])
+                  + ' coins (' + str(bulk_stats['pages']) + ' pages, ' + str(bulk_stats['fallbacks'])
+                  + ' single lookups), saved ' + str(bulk_stats['saved']), '']
+    lines += ['Total Portfolio Value: ' + Back.GREEN + '$' + '{:,}'.format(round(portfolio_value, 2)) + Style.RESET_ALL,
+              '',
+              'API Results Last Updated on ' + (updated_string(last_updated) if last_updated else 'n/a'),
+              '']
+    return lines
@@ -0,0 +1,273 @@
+# Local market-data daemon shared by the coin scripts.
+# Polls upstream once every POLL_INTERVAL seconds for the global data and the
+# top DAEMON_COINS tickers (streamed into a coinrecord.MarketSnapshot) and
+# answers the same /v2/ paths upstream does over keep-alive HTTP on localhost.
+# Responses are built once per poll and then served from memory, so a local
+# read is a dict lookup and one socket write. Other currencies are converted
+# from BASE through coinfx. Anything the snapshot cannot answer (tickers below
+# the polled coins, other sort orders over a partial market, listings) is
+# fetched upstream on the scripts' behalf and cached for one interval, so N
+# tools running at once still cost one upstream feed and one rate budget.
+#
+# The scripts need no changes: the first time coinapi cannot answer a request
+# from a local cache it looks for a daemon at coinapi.DAEMON_URL, and when one
+# answers, get_json and stream_tickers calls for API_URL are read from it
+# instead. COINMARKETCAP_DAEMON= (empty) turns that off. Ticker responses carry
+# the fields coinparse keeps (TICKER_FIELDS and QUOTE_FIELDS), which are the
+# ones the scripts read.
+#
+#   python coindaemon.py --coins 500 --interval 30
+#   python coindaemon.py --status
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain
+from urllib.parse import parse_qs, urlsplit
+
+import coinapi
+from coinapi import API_URL, PAGE_SIZE, find_daemon, get_json, request_error, stream_tickers, ticker_page_url
+from coincache import ResponseCache
+from coinfx import BASE, FxRates
+from coinrecord import MarketSnapshot
+
+PORT = 8766   # coinapi.DAEMON_URL's port
+DAEMON_COINS = 200
+POLL_INTERVAL = 60
+
+# upstream sort name -> (snapshot field, descending)
+TICKER_SORTS = {
+    'rank': ('rank', False),
+    'id': ('id', False),
+    'volume_24h': ('volume_24h', True),
+    'percent_change_24h': ('percent_change_24h', True),
+}
+
+
+class UpstreamError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class MarketFeed:
+    # The latest upstream data, refreshed by poll(), and the responses built from it.
+
+    def __init__(self, coins=DAEMON_COINS, interval=POLL_INTERVAL, fx=None, clock=time.time):
+        self.coins = coins
+        self.interval = interval
+        self.fx = fx or FxRates()
+        self.clock = clock
+        self.snapshot = None
+        self.global_data = None
+        self.fetched_at = None
+        # everything fetched on a script's behalf, kept for one interval
+        self.cache = ResponseCache(path=None, ttl=interval)
+        self.responses = {}   # request path -> body, rebuilt after every poll
+        self.stats = {'polls': 0, 'poll_errors': 0, 'poll_requests': 0, 'served': 0, 'built': 0}
+        self._lock = threading.Lock()
+
+    def poll(self):
+        starts = range(1, self.coins + 1, PAGE_SIZE)
+        pages = [stream_tickers(ticker_page_url(start, min(PAGE_SIZE, self.coins - start + 1), BASE), BASE)
+                 for start in starts]
+        global_data = get_json(API_URL + 'global/?convert=' + BASE)['data']
+        snapshot = MarketSnapshot.from_tickers(chain.from_iterable(pages), BASE, self.clock())
+        with self._lock:
+            self.global_data = global_data
+            self.snapshot = snapshot
+            self.fetched_at = snapshot.fetched_at
+            self.responses = {}
+            self.stats['polls'] += 1
+            self.stats['poll_requests'] += 1 + len(starts)
+
+    def run(self, stop):
+        # Polls every interval until stop is set; a failed poll keeps serving the last snapshot.
+        while not stop.wait(self.interval):
+            try:
+                self.poll()
+            except (request_error(), ValueError, KeyError, TypeError):
+                with self._lock:
+                    self.stats['poll_errors'] += 1
+
+    def metadata(self):
+        return {'timestamp': int(self.fetched_at), 'num_cryptocurrencies': self.global_data['active_cryptocurrencies'],
+                'error': None}
+
+    def covers_market(self):
+        return len(self.snapshot) >= self.global_data['active_cryptocurrencies']
+
+    def response(self, path, query):
+        # Response body for a /v2/ path. Answers built from the snapshot are kept
+        # until the next poll; the rest come from upstream through the cache.
+        with self._lock:
+            self.stats['served'] += 1
+            responses = self.responses
+        body = responses.get(path)
+        if body is not None:
+            return body
+
+        parts = [part for part in urlsplit(path).path.split('/') if part][1:]
+        convert = query.get('convert', 'USD').upper()
+        if parts == ['global']:
+            data = self.fx.localize(dict(self.global_data, quotes=dict(self.global_data['quotes'])), convert)
+            body = self.encode({'data': data, 'metadata': self.metadata()})
+        elif parts == ['ticker']:
+            body = self.ticker_list(query, convert)
+        elif len(parts) == 2 and parts[0] == 'ticker' and parts[1].isdigit():
+            body = self.ticker(int(parts[1]), query, convert)
+        else:
+            body = None
+        if body is None:
+            return self.upstream(path)
+
+        with self._lock:
+            self.stats['built'] += 1
+        responses[path] = body
+        return body
+
+    def ticker_list(self, query, convert):
+        # None when the snapshot cannot answer: a range past the polled coins, or
+        # another sort order over part of the market.
+        start = max(int(query.get('start', 1)), 1)
+        limit = int(query.get('limit', 100))
+        sort = query.get('sort', 'rank')
+        snapshot = self.snapshot
+        if sort not in TICKER_SORTS:
+            return None
+        if not self.covers_market() and (sort != 'rank' or start + limit - 1 > len(snapshot)):
+            return None
+
+        page = snapshot.sort(*TICKER_SORTS[sort])[start - 1:start - 1 + limit]
+        tickers = self.fx.localize_all(page.to_tickers(), convert)
+        if query.get('structure') == 'array':
+            data = tickers
+        else:
+            data = dict((str(currency['id']), currency) for currency in tickers)
+        return self.encode({'data': data, 'metadata': self.metadata()})
+
+    def ticker(self, coin_id, query, convert):
+        coin = self.snapshot.find(coin_id)
+        if coin is None:
+            return None
+        currency = self.fx.localize(coin.to_ticker(), convert)
+        data = [currency] if query.get('structure') == 'array' else currency
+        return self.encode({'data': data, 'metadata': self.metadata()})
+
+    def upstream(self, path):
+        # Upstream's answer through the shared cache; UpstreamError carries its status.
+        try:
+            return self.encode(get_json(API_URL + path.split('/v2/', 1)[1], cache=self.cache))
+        except request_error() as error:
+            response = getattr(error, 'response', None)
+            raise UpstreamError(502 if response is None else response.status_code, str(error))
+
+    def encode(self, body):
+        return json.dumps(body).encode()
+
+    def status(self):
+        with self._lock:
+            status = dict(self.stats, daemon='coindaemon', coins=len(self.snapshot) if self.snapshot else 0,
+                          fetched_at=self.fetched_at, interval=self.interval, upstream_url=API_URL,
+                          upstream_requests=self.stats['poll_requests'] + self.cache.stats['misses']
+                          + self.fx.stats['fetches'])
+        return status
+
+
+class DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, feed):
+        super().__init__(address, DaemonHandler)
+        self.feed = feed
+
+    @property
+    def api_url(self):
+        return 'http://' + self.server_address[0] + ':' + str(self.server_address[1]) + '/v2/'
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, payload):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_error_json(self, status, message):
+        self.send_body(status, json.dumps({'data': None, 'metadata': {'timestamp': int(time.time()),
+                                                                      'error': message}}).encode())
+
+    def do_GET(self):
+        feed = self.server.feed
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') == '/daemon/status':
+            self.send_body(200, json.dumps(feed.status()).encode())
+            return
+        if not url.path.startswith('/v2/'):
+            self.send_error_json(404, 'Not found')
+            return
+        if feed.snapshot is None:
+            self.send_error_json(503, 'coindaemon has not polled upstream yet')
+            return
+
+        query = dict((name, values[-1]) for name, values in parse_qs(url.query).items())
+        try:
+            self.send_body(200, feed.response(self.path, query))
+        except UpstreamError as error:
+            self.send_error_json(error.status, str(error))
+        except ValueError as error:
+            self.send_error_json(400, str(error))
+
+
+def start(feed, port=0):
+    # Polls and serves from background threads; returns (server, stop event).
+    # This process's own coinapi calls go upstream from then on.
+    coinapi.set_daemon(None)
+    server = DaemonServer(('127.0.0.1', port), feed)
+    stop = threading.Event()
+    feed.poll()
+    threading.Thread(target=feed.run, args=(stop,), name='coindaemon-poll', daemon=True).start()
+    threading.Thread(target=server.serve_forever, name='coindaemon', daemon=True).start()
+    return server, stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Poll CoinMarketCap once and serve it to the coin scripts.')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--coins', type=int, default=DAEMON_COINS, help='top coins polled each interval')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='seconds between polls')
+    parser.add_argument('--status', action='store_true', help="print a running daemon's counters and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        client = find_daemon('http://127.0.0.1:' + str(args.port) + '/v2/')
+        print(json.dumps(client.status(), indent=2) if client else 'No coindaemon running')
+        return
+
+    # the daemon itself always talks to upstream
+    coinapi.set_daemon(None)
+    feed = MarketFeed(args.coins, args.interval)
+    server = DaemonServer(('127.0.0.1', args.port), feed)
+    feed.poll()
+    stop = threading.Event()
+    threading.Thread(target=feed.run, args=(stop,), name='coindaemon-poll', daemon=True).start()
+    print('Serving ' + str(len(feed.snapshot)) + ' coins from ' + API_URL + ' at ' + server.api_url
+          + ', polling every ' + str(args.interval) + 's')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == '__main__':
+    main()
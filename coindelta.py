@@ -0,0 +1,113 @@
+# Incremental refresh keyed on last_updated.
+# Upstream only recomputes a coin's quote when it bumps the coin's
+# last_updated, so a record whose last_updated has not moved carries the same
+# numbers as last time. DeltaTracker remembers the last_updated seen for every
+# id and picks out the records of a fresh listing that are new or have moved,
+# which is all tables, alerts and the snapshot store need to redo. Listings of
+# ticker dicts and coinrecord.MarketSnapshots both work; the comparison is one
+# vectorised pass over the ids, and whatever runs on the changed records then
+# scales with churn rather than with market size. Records without a
+# last_updated always count as changed.
+#
+# DeltaCache keeps something built from each record (a table row, a block of
+# text) by id and rebuilds it only for the records the tracker reports.
+
+import numpy as np
+
+from coinrecord import MarketSnapshot
+
+
+class DeltaTracker:
+
+    def __init__(self):
+        # seen ids, sorted, and the last_updated last seen for each
+        self.ids = np.empty(0, dtype='<i8')
+        self.updated = np.empty(0, dtype='<f8')
+        self.refreshes = 0
+        self.records = 0
+        self.changes = 0
+        self.last_records = 0
+        self.last_changes = 0
+
+    def changed_mask(self, ids, updated):
+        # True for each (id, last_updated) that is new or has moved; remembers them all.
+        ids = np.asarray(ids, dtype='<i8')
+        updated = np.asarray(updated, dtype='<f8')
+        positions = np.searchsorted(self.ids, ids)
+        known = positions < len(self.ids)
+        known[known] = self.ids[positions[known]] == ids[known]
+        previous = np.full(len(ids), np.nan)
+        previous[known] = self.updated[positions[known]]
+        # NaN never compares equal, so unknown ids and missing last_updated both count as changed
+        mask = previous != updated
+
+        self.updated[positions[known & mask]] = updated[known & mask]
+        if not known.all():
+            new_ids, first = np.unique(ids[~known], return_index=True)
+            ids_all = np.concatenate([self.ids, new_ids])
+            order = np.argsort(ids_all, kind='stable')
+            self.ids = ids_all[order]
+            self.updated = np.concatenate([self.updated, updated[~known][first]])[order]
+
+        self.refreshes += 1
+        self.last_records = len(ids)
+        self.last_changes = int(mask.sum())
+        self.records += self.last_records
+        self.changes += self.last_changes
+        return mask
+
+    def forget(self):
+        # Every id counts as new again on its next record; the counts are kept.
+        self.ids = self.ids[:0]
+        self.updated = self.updated[:0]
+
+    def delta(self, records):
+        # The changed records: a view of a MarketSnapshot, or a list of the ticker dicts.
+        if isinstance(records, MarketSnapshot):
+            return records.filter(self.changed_mask(records.column('id'), records.column('last_updated')))
+        records = [currency for currency in records if currency is not None]
+        mask = self.changed_mask([currency['id'] for currency in records],
+                                 [np.nan if currency.get('last_updated') is None else currency['last_updated']
+                                  for currency in records])
+        return [currency for currency, changed in zip(records, mask) if changed]
+
+    def change_rate(self):
+        # Share of records that changed over every refresh so far.
+        return self.changes / self.records if self.records else 0.0
+
+    def last_change_rate(self):
+        return self.last_changes / self.last_records if self.last_records else 0.0
+
+    def summary(self):
+        return (str(self.last_changes) + ' of ' + str(self.last_records) + ' coins changed at the last refresh ('
+                + '{:.0%}'.format(self.last_change_rate()) + '), ' + '{:.0%}'.format(self.change_rate())
+                + ' over ' + str(self.refreshes) + ' refreshes')
+
+
+class DeltaCache:
+    # build(record) -> value, kept by coin id and rebuilt when the record changes.
+    # Updating again from the same source (the records object itself unless
+    # given, say the listing a converted copy was made from) is free and not
+    # counted as a refresh.
+
+    def __init__(self, build):
+        self.build = build
+        self.tracker = DeltaTracker()
+        self.values = {}
+        self._last = None
+
+    def update(self, records, source=None):
+        # Returns the changed records, as DeltaTracker.delta does.
+        source = records if source is None else source
+        if source is self._last:
+            return records[:0] if isinstance(records, MarketSnapshot) else []
+        self._last = source
+        changed = self.tracker.delta(records)
+        for record in changed:
+            self.values[record.id if isinstance(changed, MarketSnapshot) else record['id']] = self.build(record)
+        return changed
+
+    def ordered(self, ids):
+        # The values for ids, in that order, such as a sorted snapshot's column('id').
+        values = self.values
+        return [values[int(coin_id)] for coin_id in ids]
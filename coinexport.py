@@ -0,0 +1,132 @@
+# Streaming exporters for full-market ticker dumps.
+# Each writer takes pages of ticker dicts as they arrive and writes them out in
+# chunks, so memory use depends on CHUNK_ROWS rather than on the listing size.
+# xlsx and csv need nothing extra; parquet and arrow need pyarrow.
+
+import csv
+
+CHUNK_ROWS = 1000
+FORMATS = ['xlsx', 'csv', 'parquet', 'arrow']
+EXTENSIONS = {'xlsx': '.xlsx', 'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+# (column name, spreadsheet header, quote field or None for top-level text fields)
+FIELDS = [
+    ('name', 'Name', None),
+    ('symbol', 'Symbol', None),
+    ('market_cap', 'Market Cap', 'market_cap'),
+    ('price', 'Price', 'price'),
+    ('volume_24h', '24H Volume', 'volume_24h'),
+    ('percent_change_1h', 'Hour Change', 'percent_change_1h'),
+    ('percent_change_24h', 'Day Change', 'percent_change_24h'),
+    ('percent_change_7d', 'Week Change', 'percent_change_7d'),
+]
+
+
+def ticker_row(currency, convert='USD'):
+    quotes = currency['quotes'][convert]
+    return [currency[name] if field is None else quotes[field] for name, header, field in FIELDS]
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit('The parquet and arrow formats need pyarrow (pip install pyarrow)')
+    return pyarrow
+
+
+class XlsxWriter:
+
+    def __init__(self, path):
+        import xlsxwriter
+        # constant_memory flushes each row to disk as soon as the next one starts
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        self.sheet = self.workbook.add_worksheet()
+        self.sheet.write_row(0, 0, [header for name, header, field in FIELDS])
+        self.row = 1
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.sheet.write_string(self.row, 0, row[0])
+            self.sheet.write_string(self.row, 1, row[1])
+            # numbers stay numeric so the sheet can do math on them; missing values are left blank
+            for column, number in enumerate(row[2:], 2):
+                if number is not None:
+                    self.sheet.write_number(self.row, column, number)
+            self.row += 1
+
+    def close(self):
+        self.workbook.close()
+
+
+class CsvWriter:
+
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, header, field in FIELDS])
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowBatchWriter:
+    # Buffers up to CHUNK_ROWS rows and hands each full chunk to pyarrow as one record batch.
+
+    def __init__(self, path):
+        self.pa = import_pyarrow()
+        self.schema = self.pa.schema([(name, self.pa.string() if field is None else self.pa.float64())
+                                      for name, header, field in FIELDS])
+        self.writer = self.open_writer(path)
+        self.buffer = []
+
+    def write_rows(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        columns = [self.pa.array(column, type=self.schema.field(i).type)
+                   for i, column in enumerate(zip(*self.buffer))]
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(columns, schema=self.schema))
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class ParquetWriter(_ArrowBatchWriter):
+
+    def open_writer(self, path):
+        return self.pa.parquet.ParquetWriter(path, self.schema)
+
+
+class ArrowWriter(_ArrowBatchWriter):
+
+    def open_writer(self, path):
+        return self.pa.ipc.new_file(path, self.schema)
+
+
+WRITERS = {'xlsx': XlsxWriter, 'csv': CsvWriter, 'parquet': ParquetWriter, 'arrow': ArrowWriter}
+
+
+def export(pages, fmt, path, convert='USD'):
+    # Writes every page of ticker dicts to path in the given format; returns the row count.
+    writer = WRITERS[fmt](path)
+    count = 0
+    try:
+        for data in pages:
+            rows = [ticker_row(currency, convert) for currency in data]
+            writer.write_rows(rows)
+            count += len(rows)
+    finally:
+        writer.close()
+    return count
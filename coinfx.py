@@ -0,0 +1,100 @@
+# Local currency conversion for CoinMarketCap quotes.
+# Tickers are fetched once in BASE and converted here instead of asking
+# upstream again with another convert=. Rates come from the Bitcoin ticker,
+# which upstream quotes in both USD and the requested currency, and are kept in
+# FX_PATH for FX_TTL seconds, independently of how fresh the ticker data is.
+# Converted quotes have the same keys as upstream's quotes[convert]: money
+# fields are scaled by the rate and percentage changes are carried over as they
+# are, so they describe the move in BASE.
+
+import json
+import os
+import threading
+import time
+
+from coinapi import get_json, ticker_url
+
+BASE = 'USD'
+FX_PATH = 'fx_rates.json'
+FX_TTL = 3600
+FX_COIN_ID = 1   # Bitcoin
+MONEY_FIELDS = ('price', 'volume_24h', 'market_cap', 'total_market_cap', 'total_volume_24h')
+
+
+def convert_quote(quote, rate):
+    converted = dict(quote)
+    for field in MONEY_FIELDS:
+        if converted.get(field) is not None:
+            converted[field] = converted[field] * rate
+    return converted
+
+
+def fetch_rate(currency):
+    # Units of currency per USD.
+    results = get_json(ticker_url(FX_COIN_ID, currency))
+    quotes = results['data'][0]['quotes']
+    return quotes[currency]['price'] / quotes['USD']['price']
+
+
+class FxRates:
+
+    def __init__(self, path=FX_PATH, ttl=FX_TTL, base=BASE, fetch=fetch_rate, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.base = base
+        self.fetch = fetch
+        self.clock = clock
+        self.stats = {'hits': 0, 'fetches': 0}
+        self._lock = threading.Lock()
+        # currency -> (units per USD, fetched_at)
+        self.rates = {'USD': (1.0, float('inf'))}
+        if path is not None and os.path.exists(path):
+            with open(path) as inp:
+                for currency, (rate, fetched_at) in json.load(inp).items():
+                    self.rates.setdefault(currency, (rate, fetched_at))
+
+    def _save(self):
+        if self.path is None:
+            return
+        stored = dict((currency, entry) for currency, entry in self.rates.items() if currency != 'USD')
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as out:
+            json.dump(stored, out)
+        os.replace(temp_path, self.path)
+
+    def _usd_rate(self, currency):
+        currency = currency.upper()
+        with self._lock:
+            entry = self.rates.get(currency)
+            if entry is not None and self.clock() - entry[1] < self.ttl:
+                self.stats['hits'] += 1
+                return entry[0]
+            self.stats['fetches'] += 1
+            self.rates[currency] = (self.fetch(currency), self.clock())
+            self._save()
+            return self.rates[currency][0]
+
+    def rate(self, currency):
+        # Units of currency per unit of base.
+        if currency.upper() == self.base:
+            return 1.0
+        return self._usd_rate(currency) / self._usd_rate(self.base)
+
+    def localize(self, item, convert):
+        # Adds quotes[convert] to a ticker or global dict fetched in base; returns the dict.
+        return self.localize_all([item], convert)[0]
+
+    def localize_all(self, items, convert):
+        if convert == self.base:
+            return items
+        rate = self.rate(convert)
+        for item in items:
+            if item is not None:
+                item['quotes'][convert] = convert_quote(item['quotes'][self.base], rate)
+        return items
+
+    def localize_snapshot(self, snapshot, convert):
+        # The coinrecord.MarketSnapshot equivalent: a converted copy, or snapshot itself in base.
+        if convert == self.base:
+            return snapshot
+        return snapshot.converted(convert, self.rate(convert), MONEY_FIELDS)
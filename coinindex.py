@@ -0,0 +1,148 @@
+# Persistent symbol -> id index built from /v2/listings/.
+# Kept in SQLite so startup is a local lookup. Once the index is older than INDEX_TTL
+# it is still used as-is while a background thread downloads a fresh copy.
+# Duplicate symbols are all kept; lookups resolve to the lowest (oldest) id.
+# It also remembers the last rank seen for each id, which the bulk page fetcher
+# uses to work out which ranked pages to ask for.
+
+import sqlite3
+import threading
+import time
+
+from coinapi import API_URL, get_json
+
+INDEX_PATH = 'listings.db'
+INDEX_TTL = 24 * 60 * 60
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS listings (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    name TEXT NOT NULL,
+    website_slug TEXT
+);
+CREATE INDEX IF NOT EXISTS listings_symbol ON listings (symbol);
+CREATE TABLE IF NOT EXISTS ranks (
+    id INTEGER PRIMARY KEY,
+    rank INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+def download_listings():
+    results = get_json(API_URL + 'listings/')
+    return results['data']
+
+
+class SymbolIndex:
+    # Read side is dict-like (index[symbol], symbol in index, index.get(symbol))
+    # so it drops in where the scripts used to build ticker_url_pairs.
+
+    def __init__(self, path=INDEX_PATH, ttl=INDEX_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._conn = self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        return conn
+
+    def updated_at(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'updated_at'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    def age(self):
+        return time.time() - self.updated_at()
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM listings LIMIT 1').fetchone() is None
+
+    def is_stale(self):
+        return self.age() > self.ttl
+
+    def ids(self, symbol):
+        # Every id listed under this symbol, oldest first.
+        with self._lock:
+            rows = self._conn.execute('SELECT id FROM listings WHERE symbol = ? ORDER BY id',
+                                      (symbol.upper(),)).fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, symbol, default=None):
+        ids = self.ids(symbol)
+        return ids[0] if ids else default
+
+    def __getitem__(self, symbol):
+        coin_id = self.get(symbol)
+        if coin_id is None:
+            raise KeyError(symbol)
+        return coin_id
+
+    def __contains__(self, symbol):
+        return self.get(symbol) is not None
+
+    def listings(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT id, name, symbol, website_slug FROM listings ORDER BY id').fetchall()
+        return [{'id': row[0], 'name': row[1], 'symbol': row[2], 'website_slug': row[3]} for row in rows]
+
+    def store(self, data):
+        rows = [(currency['id'], currency['symbol'].upper(), currency['name'], currency.get('website_slug'))
+                for currency in data]
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM listings')
+            self._conn.executemany('INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?)', rows)
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('updated_at', ?)", (str(time.time()),))
+
+    def ranks(self, ids):
+        ids = list(set(coin_id for coin_id in ids if coin_id is not None))
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                query = 'SELECT id, rank FROM ranks WHERE id IN (' + ','.join('?' * len(chunk)) + ')'
+                found.update(self._conn.execute(query, chunk).fetchall())
+        return found
+
+    def remember_ranks(self, currencies):
+        rows = [(currency['id'], currency['rank']) for currency in currencies
+                if currency is not None and currency.get('rank') is not None]
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO ranks VALUES (?, ?)', rows)
+
+    def refresh(self):
+        self.store(download_listings())
+
+    def refresh_in_background(self):
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return self._refresh_thread
+
+        def run():
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the old index; the next start will try again.
+                pass
+
+        self._refresh_thread = threading.Thread(target=run, name='listings-refresh', daemon=True)
+        self._refresh_thread.start()
+        return self._refresh_thread
+
+
+def load_index(path=INDEX_PATH, ttl=INDEX_TTL):
+    # Only the very first run blocks on the download.
+    index = SymbolIndex(path, ttl)
+    if index.is_empty():
+        index.refresh()
+    elif index.is_stale():
+        index.refresh_in_background()
+    return index
@@ -0,0 +1,186 @@
+# Shared rate limiting for every CoinMarketCap request, across processes.
+# The token bucket lives in a small state file next to a lock file, so when
+# Coincap2, CoinPortfolio, Cointop100 and the exporter run at the same time
+# they share one request budget instead of each spending its own: upstream's
+# 30 requests a minute, with a burst big enough for a CoinPortfolio refresh to
+# go out at full concurrency. COINMARKETCAP_RATE_LIMIT and
+# COINMARKETCAP_RATE_BURST override them, and COINMARKETCAP_RATE_LIMIT=none
+# lifts the budget (for a mock server, say). A 429 or 5xx seen by any process
+# pauses the others until its backoff has passed, budget or not.
+#
+#   python coinlimit.py          prints the shared counters
+#   python coinlimit.py --reset  zeroes them
+
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+from coinlock import locked
+
+STATE_PATH = os.environ.get('COINMARKETCAP_RATE_STATE',
+                            os.path.join(tempfile.gettempdir(), 'coinmarketcap-rate.bin'))
+# None leaves requests unbudgeted
+REQUESTS_PER_MINUTE = os.environ.get('COINMARKETCAP_RATE_LIMIT', '30')
+REQUESTS_PER_MINUTE = None if REQUESTS_PER_MINUTE.lower() in ('none', '0') else float(REQUESTS_PER_MINUTE)
+# covers a 50-position CoinPortfolio run, which fetches every position at once
+BURST = int(os.environ.get('COINMARKETCAP_RATE_BURST', 60))
+
+BACKOFF_BASE = 1.0    # seconds before the first retry, doubled on each retry after that
+BACKOFF_CAP = 60.0
+MAX_RETRIES = 5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# tokens, updated, blocked_until, requests, throttled, throttled_seconds, backoffs, backoff_seconds
+STATE_FORMAT = '<8d'
+COUNTERS = ['requests', 'throttled', 'throttled_seconds', 'backoffs', 'backoff_seconds']
+
+
+class RateLimiter:
+
+    def __init__(self, path=STATE_PATH, requests_per_minute=REQUESTS_PER_MINUTE, burst=BURST,
+                 clock=time.time, sleep=time.sleep):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.rate = None if requests_per_minute is None else requests_per_minute / 60.0
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        # this process's share of the counters
+        self.local = dict((name, 0.0) for name in COUNTERS)
+
+    def _read(self):
+        try:
+            with open(self.path, 'rb') as inp:
+                values = list(struct.unpack(STATE_FORMAT, inp.read(struct.calcsize(STATE_FORMAT))))
+        except (FileNotFoundError, struct.error):
+            values = [float(self.burst), self.clock(), 0.0] + [0.0] * len(COUNTERS)
+        state = dict(zip(['tokens', 'updated', 'blocked_until'] + COUNTERS, values))
+        # refill for the time since the last writer
+        now = self.clock()
+        if self.rate is not None:
+            state['tokens'] = min(float(self.burst), state['tokens'] + max(0.0, now - state['updated']) * self.rate)
+        state['updated'] = now
+        return state
+
+    def _write(self, state):
+        values = [state[name] for name in ['tokens', 'updated', 'blocked_until'] + COUNTERS]
+        with open(self.path, 'wb') as out:
+            out.write(struct.pack(STATE_FORMAT, *values))
+
+    def _count(self, state, name, amount=1.0):
+        state[name] += amount
+        self.local[name] += amount
+
+    def acquire(self):
+        # Blocks until a request may go out; returns how long it waited.
+        if self.rate is None:
+            return self._wait_for_backoff()
+        waited = 0.0
+        while True:
+            with locked(self.lock_path):
+                state = self._read()
+                wait = state['blocked_until'] - state['updated']
+                if wait <= 0 and state['tokens'] >= 1:
+                    state['tokens'] -= 1
+                    self._count(state, 'requests')
+                    if waited:
+                        self._count(state, 'throttled')
+                        self._count(state, 'throttled_seconds', waited)
+                    self._write(state)
+                    return waited
+                if wait <= 0:
+                    wait = (1 - state['tokens']) / self.rate
+                self._write(state)
+            self.sleep(wait)
+            waited += wait
+
+    def _wait_for_backoff(self):
+        # Without a budget there are no tokens to spend, so the state file is only
+        # read, for another process's backoff, and the counters stay local.
+        waited = 0.0
+        while True:
+            with locked(self.lock_path):
+                state = self._read()
+            wait = state['blocked_until'] - state['updated']
+            if wait <= 0:
+                self.local['requests'] += 1
+                if waited:
+                    self.local['throttled'] += 1
+                    self.local['throttled_seconds'] += waited
+                return waited
+            self.sleep(wait)
+            waited += wait
+
+    def backoff(self, attempt, retry_after=None):
+        # Called after a 429/5xx: works out a full-jitter exponential delay (or
+        # honours Retry-After), tells every other process to hold off for as long,
+        # and sleeps it out here.
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        with locked(self.lock_path):
+            state = self._read()
+            state['blocked_until'] = max(state['blocked_until'], state['updated'] + delay)
+            self._count(state, 'backoffs')
+            self._count(state, 'backoff_seconds', delay)
+            self._write(state)
+        self.sleep(delay)
+        return delay
+
+    def shared_stats(self):
+        with locked(self.lock_path):
+            state = self._read()
+        return dict((name, state[name]) for name in COUNTERS)
+
+    def reset(self):
+        with locked(self.lock_path):
+            state = self._read()
+            for name in COUNTERS:
+                state[name] = 0.0
+            self._write(state)
+
+
+_limiter = None
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter()
+    return _limiter
+
+
+def set_limiter(limiter):
+    # Replaces this process's limiter, for example with a budgeted one.
+    global _limiter
+    _limiter = limiter
+
+
+def retry_after_seconds(response):
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return min(BACKOFF_CAP, max(0.0, float(value)))
+    except ValueError:
+        return None
+
+
+if __name__ == '__main__':
+    limiter = get_limiter()
+    if '--reset' in sys.argv[1:]:
+        limiter.reset()
+    stats = limiter.shared_stats()
+    if REQUESTS_PER_MINUTE is None:
+        print('Shared limiter: no request budget (COINMARKETCAP_RATE_LIMIT=none), backoffs shared')
+    else:
+        print('Shared limiter: ' + '{:g}'.format(REQUESTS_PER_MINUTE) + ' requests/minute, burst ' + str(BURST))
+    print('Requests:            ' + '{:,.0f}'.format(stats['requests']))
+    print('Throttled:           ' + '{:,.0f}'.format(stats['throttled']) + ' requests, '
+          + '{:,.1f}'.format(stats['throttled_seconds']) + 's waiting')
+    print('Backoffs (429/5xx): ' + '{:,.0f}'.format(stats['backoffs']) + ', '
+          + '{:,.1f}'.format(stats['backoff_seconds']) + 's waiting')
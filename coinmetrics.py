@@ -0,0 +1,221 @@
+# Request-level metrics for the coin scripts.
+# Off unless COINMARKETCAP_METRICS names a directory. When it does, coinapi and
+# cointable record per-endpoint latency histograms (connect, TLS, time to first
+# byte, whole request, JSON parsing), bytes received, retries, rate-limit
+# waits, cache results and table render time, and at exit the script writes
+# <script>.prom in the Prometheus text format (for node_exporter's textfile
+# collector) and <script>.json with a summary. When metrics are off, timer()
+# hands back one shared no-op context manager and the other calls return
+# straight away, and hot paths check ENABLED before doing any work.
+
+import atexit
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+METRICS_DIR = os.environ.get('COINMARKETCAP_METRICS')
+ENABLED = bool(METRICS_DIR)
+SCRIPT = os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help)
+METRICS = {
+    'coin_request_seconds': ('histogram', 'Whole request time, headers and body, per attempt.'),
+    'coin_connect_seconds': ('histogram', 'DNS lookup and TCP connect for new connections.'),
+    'coin_tls_seconds': ('histogram', 'TLS handshake for new connections.'),
+    'coin_ttfb_seconds': ('histogram', 'From sending the request to the response headers.'),
+    'coin_parse_seconds': ('histogram', 'JSON parsing of whole responses.'),
+    'coin_stream_seconds': ('histogram', 'Streamed ticker lists, download and parsing together.'),
+    'coin_rate_limit_wait_seconds': ('histogram', 'Time spent waiting on the shared rate limiter.'),
+    'coin_render_seconds': ('histogram', 'Table rendering and output.'),
+    'coin_requests_total': ('counter', 'Upstream requests by endpoint and status code.'),
+    'coin_response_bytes_total': ('counter', 'Response body bytes received.'),
+    'coin_retries_total': ('counter', 'Requests retried after a 429 or 5xx.'),
+    'coin_cache_lookups_total': ('counter', 'Response cache lookups by result.'),
+}
+
+_lock = threading.Lock()
+_histograms = {}   # (name, labels) -> [bucket counts..., +Inf count], plus sum
+_sums = {}
+_counters = {}
+_null = nullcontext()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        counts = _histograms.get(key)
+        if counts is None:
+            counts = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1)
+            _sums[key] = 0.0
+        counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        _sums[key] += value
+
+
+def inc(name, amount=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+class _Timer:
+    __slots__ = ('name', 'labels', 'started')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+
+def timer(name, **labels):
+    return _Timer(name, labels) if ENABLED else _null
+
+
+def endpoint(url):
+    # 'https://host/v2/ticker/1/?convert=USD' -> 'ticker/id'
+    parts = [part for part in urlsplit(url).path.split('/') if part]
+    if parts and parts[0] == 'v2':
+        parts = parts[1:]
+    if not parts:
+        return 'other'
+    if parts[0] == 'ticker' and len(parts) > 1:
+        return 'ticker/id'
+    return parts[0]
+
+
+def instrument_adapter(adapter):
+    # Makes the adapter's connection pools time connection setup.
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedHTTPConnection(HTTPConnection):
+        def _new_conn(self):
+            started = time.perf_counter()
+            sock = super()._new_conn()
+            observe('coin_connect_seconds', time.perf_counter() - started, host=self.host)
+            return sock
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def _new_conn(self):
+            started = time.perf_counter()
+            sock = super()._new_conn()
+            self._connect_seconds = time.perf_counter() - started
+            observe('coin_connect_seconds', self._connect_seconds, host=self.host)
+            return sock
+
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            observe('coin_tls_seconds', time.perf_counter() - started - getattr(self, '_connect_seconds', 0.0),
+                    host=self.host)
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    adapter.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                  'https': TimedHTTPSConnectionPool}
+    return adapter
+
+
+def _labels_text(labels, extra=()):
+    items = [('script', SCRIPT)] + list(labels) + list(extra)
+    return '{' + ','.join(name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+                          for name, value in items) + '}'
+
+
+def prometheus_text():
+    lines = []
+    with _lock:
+        histograms = dict((key, list(counts)) for key, counts in _histograms.items())
+        sums = dict(_sums)
+        counters = dict(_counters)
+    for name, (kind, help_text) in METRICS.items():
+        series = sorted(key for key in (histograms if kind == 'histogram' else counters) if key[0] == name)
+        if not series:
+            continue
+        lines.append('# HELP ' + name + ' ' + help_text)
+        lines.append('# TYPE ' + name + ' ' + kind)
+        for key in series:
+            labels = key[1]
+            if kind == 'counter':
+                lines.append(name + _labels_text(labels) + ' ' + repr(counters[key]))
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histograms[key]):
+                cumulative += count
+                lines.append(name + '_bucket' + _labels_text(labels, [('le', bound)]) + ' ' + str(cumulative))
+            lines.append(name + '_sum' + _labels_text(labels) + ' ' + repr(sums[key]))
+            lines.append(name + '_count' + _labels_text(labels) + ' ' + str(cumulative))
+    return '\n'.join(lines) + '\n'
+
+
+def quantile(counts, q):
+    # Upper bound of the bucket holding the q-th observation; None past the last bucket.
+    rank = q * sum(counts)
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, counts):
+        cumulative += count
+        if cumulative >= rank:
+            return bound
+    return None
+
+
+def summary():
+    with _lock:
+        histograms = dict((key, list(counts)) for key, counts in _histograms.items())
+        sums = dict(_sums)
+        counters = dict(_counters)
+    result = {'script': SCRIPT, 'histograms': [], 'counters': []}
+    for (name, labels), counts in sorted(histograms.items()):
+        count = sum(counts)
+        result['histograms'].append({
+            'name': name, 'labels': dict(labels), 'count': count, 'sum': sums[(name, labels)],
+            'mean': sums[(name, labels)] / count, 'p50': quantile(counts, 0.5), 'p95': quantile(counts, 0.95),
+            'p99': quantile(counts, 0.99),
+        })
+    for (name, labels), value in sorted(counters.items()):
+        result['counters'].append({'name': name, 'labels': dict(labels), 'value': value})
+
+    lookups = dict((dict(labels)['result'], value) for (name, labels), value in counters.items()
+                   if name == 'coin_cache_lookups_total')
+    if lookups:
+        result['cache_hit_ratio'] = lookups.get('hit', 0) / sum(lookups.values())
+    return result
+
+
+def write(directory=None):
+    directory = directory or METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    for extension, text in [('.prom', prometheus_text()), ('.json', json.dumps(summary(), indent=2))]:
+        path = os.path.join(directory, SCRIPT + extension)
+        # written beside the target and renamed, so a collector never reads half a file
+        with open(path + '.tmp', 'w') as out:
+            out.write(text)
+        os.replace(path + '.tmp', path)
+
+
+if ENABLED:
+    atexit.register(write)
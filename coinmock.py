@@ -0,0 +1,268 @@
+# A local stand-in for the CoinMarketCap v2 API.
+# Replays recorded /v2/listings/, /v2/global/ and /v2/ticker/ responses from a
+# fixtures directory (listings.json, global.json, ticker.json and rates.json,
+# each a response body as upstream sent it) and answers the same queries the
+# scripts make: start/limit/sort/structure/convert on the ticker list and single
+# tickers by id. Every response can be delayed and a share of them failed, to
+# see how the scripts behave on a slow or flaky upstream. GET /mock/stats
+# returns the request counters and /mock/reset zeroes them.
+#
+#   python coinmock.py --generate 2000                  writes synthetic fixtures
+#   python coinmock.py --latency 0.05 --error-rate 0.02
+#   COINMARKETCAP_API_URL=http://127.0.0.1:8765/v2/ python CoinPortfolio.py
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_PATH = 'fixtures'
+PORT = 8765
+TICKER_SORTS = {
+    'rank': (lambda currency: currency['rank'], False),
+    'id': (lambda currency: currency['id'], False),
+    'volume_24h': (lambda currency: currency['quotes']['USD']['volume_24h'] or 0, True),
+    'percent_change_24h': (lambda currency: currency['quotes']['USD']['percent_change_24h'] or 0, True),
+}
+MONEY_FIELDS = ('price', 'volume_24h', 'market_cap', 'total_market_cap', 'total_volume_24h')
+
+
+def generate_fixtures(path=FIXTURES_PATH, coins=2000, seed=1):
+    # Synthetic fixtures shaped like the recorded responses, for when there are none.
+    rng = random.Random(seed)
+    now = int(time.time())
+    tickers = []
+    for rank in range(1, coins + 1):
+        coin_id = rank if rank <= 3 else rank * 3
+        symbol = ['BTC', 'ETH', 'XRP'][rank - 1] if rank <= 3 else 'C' + str(rank)
+        price = rng.uniform(0.0001, 60000) / rank
+        supply = rng.uniform(1e6, 1e10)
+        tickers.append({
+            'id': coin_id,
+            'name': 'Coin ' + str(rank),
+            'symbol': symbol,
+            'website_slug': 'coin-' + str(rank),
+            'rank': rank,
+            'circulating_supply': supply,
+            'total_supply': supply * rng.uniform(1, 2),
+            'max_supply': None if rank % 3 else supply * 2,
+            'quotes': {'USD': {
+                'price': price,
+                'volume_24h': rng.uniform(0, 1e9),
+                'market_cap': price * supply,
+                'percent_change_1h': round(rng.uniform(-5, 5), 2),
+                'percent_change_24h': round(rng.uniform(-20, 20), 2) if rank % 13 else None,
+                'percent_change_7d': round(rng.uniform(-50, 50), 2),
+            }},
+            'last_updated': now - rng.randint(0, 300),
+        })
+    metadata = {'timestamp': now, 'num_cryptocurrencies': coins, 'error': None}
+    listings = [dict((field, currency[field]) for field in ('id', 'name', 'symbol', 'website_slug'))
+                for currency in sorted(tickers, key=lambda currency: currency['id'])]
+    total_cap = sum(currency['quotes']['USD']['market_cap'] for currency in tickers)
+    global_data = {
+        'active_cryptocurrencies': coins,
+        'active_markets': coins * 7,
+        'bitcoin_percentage_of_market_cap': round(tickers[0]['quotes']['USD']['market_cap'] / total_cap * 100, 2),
+        'quotes': {'USD': {'total_market_cap': total_cap,
+                           'total_volume_24h': sum(currency['quotes']['USD']['volume_24h'] for currency in tickers)}},
+        'last_updated': now,
+    }
+    rates = {'USD': 1.0, 'EUR': 0.86, 'GBP': 0.76, 'JPY': 112.5, 'CAD': 1.31, 'AUD': 1.41}
+
+    os.makedirs(path, exist_ok=True)
+    for name, body in [('listings.json', {'data': listings, 'metadata': metadata}),
+                       ('global.json', {'data': global_data, 'metadata': metadata}),
+                       ('ticker.json', {'data': tickers, 'metadata': metadata}),
+                       ('rates.json', rates)]:
+        with open(os.path.join(path, name), 'w') as out:
+            json.dump(body, out)
+
+
+class Fixtures:
+
+    def __init__(self, path=FIXTURES_PATH):
+        def read(name):
+            with open(os.path.join(path, name)) as inp:
+                return json.load(inp)
+
+        self.listings = read('listings.json')
+        self.global_data = read('global.json')
+        self.tickers = sorted(read('ticker.json')['data'], key=lambda currency: currency['rank'])
+        self.by_id = dict((currency['id'], currency) for currency in self.tickers)
+        self.rates = read('rates.json') if os.path.exists(os.path.join(path, 'rates.json')) else {'USD': 1.0}
+
+
+def with_quotes(item, convert, rate):
+    # A copy of item whose quotes hold USD and, converted at rate, convert.
+    quotes = {'USD': item['quotes']['USD']}
+    if convert != 'USD':
+        quotes[convert] = dict((field, value * rate if field in MONEY_FIELDS and value is not None else value)
+                               for field, value in quotes['USD'].items())
+    return dict(item, quotes=quotes)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, seed=None):
+        super().__init__(address, MockHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+
+    @property
+    def api_url(self):
+        return 'http://' + self.server_address[0] + ':' + str(self.server_address[1]) + '/v2/'
+
+    def count(self, name, amount=1):
+        with self.stats_lock:
+            self.stats[name] += amount
+
+    def reset(self):
+        with self.stats_lock:
+            self.stats.clear()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=()):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.count('bytes', len(payload))
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {'data': None, 'metadata': {'timestamp': int(time.time()), 'error': message}})
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        query = dict((name, values[-1]) for name, values in parse_qs(url.query).items())
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts[:1] == ['mock']:
+            if parts[1:] == ['reset']:
+                server.reset()
+            with server.stats_lock:
+                stats = dict(server.stats)
+            self.send_json(200, stats)
+            return
+
+        endpoint = parts[1] if len(parts) > 1 and parts[0] == 'v2' else None
+        if endpoint == 'ticker' and len(parts) > 2:
+            endpoint = 'ticker/id'
+        server.count('requests')
+        server.count('requests:' + str(endpoint))
+
+        delay = server.latency + (server.rng.uniform(-server.jitter, server.jitter) if server.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        if server.error_rate and server.rng.random() < server.error_rate:
+            server.count('errors')
+            headers = [('Retry-After', '0')] if server.error_status == 429 else []
+            self.send_json(server.error_status, {'data': None, 'metadata': {'error': 'injected failure'}}, headers)
+            return
+
+        convert = query.get('convert', 'USD').upper()
+        rate = server.fixtures.rates.get(convert)
+        if rate is None:
+            self.send_error_json(400, 'Invalid value for "convert": "' + convert + '"')
+            return
+
+        if endpoint == 'listings':
+            self.send_json(200, server.fixtures.listings)
+        elif endpoint == 'global':
+            self.send_json(200, {'data': with_quotes(server.fixtures.global_data['data'], convert, rate),
+                                 'metadata': server.fixtures.global_data['metadata']})
+        elif endpoint == 'ticker':
+            self.ticker_list(query, convert, rate)
+        elif endpoint == 'ticker/id':
+            currency = server.fixtures.by_id.get(int(parts[2])) if parts[2].isdigit() else None
+            if currency is None:
+                self.send_error_json(404, 'id not found')
+                return
+            currency = with_quotes(currency, convert, rate)
+            data = [currency] if query.get('structure') == 'array' else currency
+            self.send_json(200, {'data': data, 'metadata': {'timestamp': int(time.time()), 'error': None}})
+        else:
+            self.send_error_json(404, 'Not found')
+
+    def ticker_list(self, query, convert, rate):
+        try:
+            start = int(query.get('start', 1))
+            limit = int(query.get('limit', 100))
+        except ValueError:
+            self.send_error_json(400, 'start and limit must be integers')
+            return
+        sort = query.get('sort', 'rank')
+        if sort not in TICKER_SORTS:
+            self.send_error_json(400, 'Invalid value for "sort": "' + sort + '"')
+            return
+
+        tickers = self.server.fixtures.tickers
+        if sort != 'rank':
+            key, descending = TICKER_SORTS[sort]
+            tickers = sorted(tickers, key=key, reverse=descending)
+        page = [with_quotes(currency, convert, rate) for currency in tickers[max(start, 1) - 1:max(start, 1) - 1 + limit]]
+        if query.get('structure') == 'array':
+            data = page
+        else:
+            data = dict((str(currency['id']), currency) for currency in page)
+        metadata = dict(self.server.fixtures.listings['metadata'], timestamp=int(time.time()), error=None)
+        self.send_json(200, {'data': data, 'metadata': metadata})
+
+
+def start(fixtures, port=0, **options):
+    # Serves from a background thread; returns the server (api_url says where).
+    server = MockServer(('127.0.0.1', port), fixtures, **options)
+    threading.Thread(target=server.serve_forever, name='coinmock', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded CoinMarketCap responses locally.')
+    parser.add_argument('--fixtures', default=FIXTURES_PATH, help='fixtures directory (default: fixtures)')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- seconds on top of --latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests that fail (0-1)')
+    parser.add_argument('--error-status', type=int, default=503, help='status code for failed requests')
+    parser.add_argument('--seed', type=int, help='seed for latency jitter and failures')
+    parser.add_argument('--generate', type=int, metavar='COINS', help='write synthetic fixtures and exit')
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_fixtures(args.fixtures, args.generate)
+        print('Wrote fixtures for ' + str(args.generate) + ' coins to ' + args.fixtures)
+        return
+
+    server = MockServer(('127.0.0.1', args.port), Fixtures(args.fixtures), args.latency, args.jitter,
+                        args.error_rate, args.error_status, args.seed)
+    print('Serving ' + args.fixtures + ' at ' + server.api_url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
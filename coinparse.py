@@ -0,0 +1,138 @@
+# JSON parsing for CoinMarketCap responses.
+# Whole responses are parsed with orjson when it is installed and the standard
+# json module otherwise. Ticker lists can instead be streamed: iter_tickers
+# reads the body a chunk at a time and yields one slim ticker dict per coin
+# holding only TICKER_FIELDS and the QUOTE_FIELDS of one currency, so a large
+# limit never has the whole payload in memory as Python objects. Streaming
+# decodes one array element at a time with the standard library's C scanner,
+# which measured faster than ijson's yajl2_c event parser on ticker responses.
+
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+TICKER_FIELDS = ('id', 'name', 'symbol', 'website_slug', 'rank', 'circulating_supply', 'total_supply',
+                 'max_supply', 'last_updated')
+QUOTE_FIELDS = ('price', 'volume_24h', 'market_cap', 'percent_change_1h', 'percent_change_24h',
+                'percent_change_7d')
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+_loads = None
+
+
+def loads(body):
+    # bytes or str -> parsed JSON, with the fastest backend available. orjson is
+    # looked for on first use rather than at import, since importing it is slow.
+    global _loads
+    if _loads is None:
+        try:
+            import orjson
+            _loads = orjson.loads
+        except ImportError:
+            _loads = json.loads
+    return _loads(body)
+
+
+def backend():
+    loads(b'null')
+    return 'json' if _loads is json.loads else 'orjson'
+
+
+def slim_ticker(currency, convert='USD', fields=TICKER_FIELDS, quote_fields=QUOTE_FIELDS):
+    # The same shape as a ticker entry, cut down to the fields asked for.
+    slim = dict(zip(fields, map(currency.get, fields)))
+    quote = (currency.get('quotes') or {}).get(convert) or {}
+    slim['quotes'] = {convert: dict(zip(quote_fields, map(quote.get, quote_fields)))}
+    return slim
+
+
+def iter_tickers(stream, convert='USD', fields=TICKER_FIELDS, quote_fields=QUOTE_FIELDS):
+    # stream: a binary file-like object holding a /v2/ticker/ response.
+    return (slim_ticker(currency, convert, fields, quote_fields) for currency in _iter_data(stream))
+
+
+class _Reader:
+    # A growing text buffer over a binary stream, decoded incrementally.
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.done = False
+
+    def more(self):
+        if self.done:
+            return False
+        chunk = self.stream.read(CHUNK_SIZE)
+        if not chunk:
+            self.done = True
+            self.buffer = self.buffer[self.pos:] + self.decoder.decode(b'', final=True)
+        else:
+            self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        # Next non-whitespace character, or '' at the end of the stream.
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError('expected ' + repr(ch) + ' in JSON stream at ' + repr(self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+
+    def value(self, decode=json.JSONDecoder().raw_decode):
+        # Decodes one complete JSON value, reading more of the stream until it fits.
+        self.peek()
+        while True:
+            try:
+                value, end = decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.more():
+                    raise
+                continue
+            # a number running into the end of the buffer may not be finished yet
+            if end == len(self.buffer) and not self.done and self.buffer[end - 1] not in '}]"':
+                self.more()
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_data(stream):
+    # Yields the elements of the top-level "data" array (or the values of a
+    # "data" object) one at a time; every other key is decoded and dropped.
+    reader = _Reader(stream)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'data' and reader.peek() == '[':
+            reader.pos += 1
+            if reader.peek() != ']':
+                while True:
+                    yield reader.value()
+                    if reader.peek() != ',':
+                        break
+                    reader.pos += 1
+            reader.expect(']')
+        else:
+            value = reader.value()
+            if key == 'data' and isinstance(value, dict):
+                for currency in value.values():
+                    yield currency
+        if reader.peek() != ',':
+            break
+        reader.pos += 1
+    reader.expect('}')
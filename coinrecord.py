@@ -0,0 +1,177 @@
+# Compact in-memory forms of ticker data.
+# Coin is a __slots__ record for one coin quoted in one currency: coin.price
+# instead of currency['quotes'][convert]['price'], with missing values as None.
+# MarketSnapshot holds a whole listing as one NumPy structured array, one
+# row per coin, with None stored as NaN and names and symbols as fixed-width
+# strings sized to the longest one in the listing. Several full-market
+# snapshots then cost a few hundred bytes per coin rather than a few KB of
+# dicts. sort(), filter() and head() return views that share the array and
+# carry only an index array; column() of an unsorted snapshot is a zero-copy
+# view of the field. Coins are built from rows only when iterated.
+
+import numpy as np
+
+from coinparse import QUOTE_FIELDS, TICKER_FIELDS
+
+FIELDS = TICKER_FIELDS + QUOTE_FIELDS
+TEXT_FIELDS = ('name', 'symbol', 'website_slug')
+# kept as floats in the array so a missing value can be NaN, given back as ints
+INT_FIELDS = ('rank', 'last_updated')
+
+
+class Coin:
+    # One coin in one currency, flattened. values are in FIELDS order.
+    __slots__ = FIELDS + ('convert',)
+
+    def __init__(self, values, convert='USD'):
+        for field, value in zip(FIELDS, values):
+            setattr(self, field, value)
+        self.convert = convert
+
+    @classmethod
+    def from_ticker(cls, currency, convert='USD'):
+        quote = currency['quotes'][convert]
+        return cls([currency.get(field) for field in TICKER_FIELDS] + [quote.get(field) for field in QUOTE_FIELDS],
+                   convert)
+
+    def values(self):
+        return tuple(getattr(self, field) for field in FIELDS)
+
+    def to_ticker(self):
+        # Back to the nested dict shape the scripts and coinparse use.
+        ticker = dict((field, getattr(self, field)) for field in TICKER_FIELDS)
+        ticker['quotes'] = {self.convert: dict((field, getattr(self, field)) for field in QUOTE_FIELDS)}
+        return ticker
+
+    def __repr__(self):
+        return ('Coin(' + str(self.rank) + ': ' + str(self.name) + ' (' + str(self.symbol) + '), '
+                + str(self.price) + ' ' + self.convert + ')')
+
+
+def _row(currency, convert):
+    # A ticker dict as a tuple in FIELDS order, ready for the structured array.
+    quote = currency['quotes'][convert]
+    row = [currency['id']]
+    for field in TICKER_FIELDS[1:]:
+        value = currency.get(field)
+        if field in TEXT_FIELDS:
+            row.append(value or '')
+        else:
+            row.append(np.nan if value is None else value)
+    for field in QUOTE_FIELDS:
+        value = quote.get(field)
+        row.append(np.nan if value is None else value)
+    return tuple(row)
+
+
+def snapshot_dtype(rows=()):
+    # Structured dtype for rows from _row; strings are as wide as the longest seen.
+    dtype = []
+    for position, field in enumerate(FIELDS):
+        if field == 'id':
+            dtype.append((field, '<i4'))
+        elif field in TEXT_FIELDS:
+            dtype.append((field, '<U' + str(max([len(row[position]) for row in rows] + [1]))))
+        else:
+            dtype.append((field, '<f8'))
+    return np.dtype(dtype)
+
+
+def _value(field, value):
+    if field in TEXT_FIELDS:
+        return value or None
+    if value != value:   # NaN
+        return None
+    if field in INT_FIELDS:
+        return int(value)
+    return value
+
+
+class MarketSnapshot:
+    # A listing as a structured array, or a sorted/filtered view of one.
+
+    __slots__ = ('array', 'index', 'convert', 'fetched_at')
+
+    def __init__(self, array, convert='USD', fetched_at=None, index=None):
+        self.array = array
+        self.index = index
+        self.convert = convert
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_tickers(cls, currencies, convert='USD', fetched_at=None):
+        # currencies can be any iterable of ticker dicts, such as coinparse.iter_tickers;
+        # only one dict is held at a time. None entries are skipped.
+        rows = [_row(currency, convert) for currency in currencies if currency is not None]
+        return cls(np.array(rows, dtype=snapshot_dtype(rows)), convert, fetched_at)
+
+    def __len__(self):
+        return len(self.array) if self.index is None else len(self.index)
+
+    def positions(self):
+        # Row numbers in the underlying array, in this view's order.
+        if self.index is None:
+            return np.arange(len(self.array))
+        return self.index
+
+    def column(self, field):
+        if self.index is None:
+            return self.array[field]
+        return self.array[field][self.index]
+
+    def values(self, field):
+        # One field as Coin attributes give it: ints for rank, None for missing values.
+        return [_value(field, value) for value in self.column(field).tolist()]
+
+    def coin(self, position):
+        row = self.array[position if self.index is None else self.index[position]].item()
+        return Coin([_value(field, value) for field, value in zip(FIELDS, row)], self.convert)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return self._view(self.positions()[position])
+        return self.coin(position)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.coin(position)
+
+    def _view(self, index):
+        return MarketSnapshot(self.array, self.convert, self.fetched_at, index)
+
+    def sort(self, field, descending=False):
+        # Missing numbers go last whichever way the column is sorted; equal numbers keep their order.
+        values = self.column(field)
+        if field in TEXT_FIELDS:
+            order = np.argsort(values, kind='stable')
+            if descending:
+                order = order[::-1]
+        else:
+            order = np.argsort(-values if descending else values, kind='stable')
+        return self._view(self.positions()[order])
+
+    def filter(self, mask):
+        # mask is a boolean array over this view, e.g. snapshot.column('price') > 1
+        return self._view(self.positions()[np.asarray(mask, dtype=bool)])
+
+    def head(self, count):
+        return self._view(self.positions()[:count])
+
+    def find(self, coin_id):
+        matches = np.flatnonzero(self.column('id') == coin_id)
+        return self.coin(int(matches[0])) if len(matches) else None
+
+    def converted(self, convert, rate, fields):
+        # A copy with the money fields (coinfx.MONEY_FIELDS) scaled by rate, for another currency.
+        array = self.array.copy() if self.index is None else self.array[self.index]
+        for field in fields:
+            if field in array.dtype.names:
+                array[field] *= rate
+        return MarketSnapshot(array, convert, self.fetched_at)
+
+    def to_tickers(self):
+        return [coin.to_ticker() for coin in self]
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes + (0 if self.index is None else self.index.nbytes)
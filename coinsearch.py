@@ -0,0 +1,146 @@
+# Symbol and name search over the coin listings.
+# Every symbol and every name goes into one lower-cased trie, and prefix search
+# walks down to the prefix's node and reads off the entries below it, shortest
+# keys first. Fuzzy search uses a deletion index instead of walking the trie:
+# every key is stored under each string that is MAX_DISTANCE or fewer deletions
+# away from its first PREFIX_LENGTH characters, so a query only has to look up
+# its own deletions and check the handful of keys they lead to. The deletion
+# index is only built the first time a fuzzy lookup needs it. Short queries are
+# allowed fewer edits, since two edits turn any short symbol into most others.
+
+from collections import deque
+
+MAX_DISTANCE = 2
+SHORT_QUERY = 4        # queries up to this long get at most one edit
+PREFIX_LENGTH = 7
+LIMIT = 8
+
+
+def deletions(word, max_distance=MAX_DISTANCE):
+    # word plus every string max_distance or fewer single-character deletions away.
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = set(key[:i] + key[i + 1:] for key in frontier for i in range(len(key)))
+        found |= frontier
+    return found
+
+
+def distance_limit(word, max_distance=MAX_DISTANCE):
+    return min(max_distance, 1 if len(word) <= SHORT_QUERY else 2)
+
+
+def edit_distance(a, b, max_distance=MAX_DISTANCE):
+    # Levenshtein distance, or None as soon as it is sure to exceed max_distance.
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ch in enumerate(a, 1):
+        row = [i]
+        for j, other in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, previous[j] + 1, previous[j - 1] + (ch != other)))
+        if min(row) > max_distance:
+            return None
+        previous = row
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+class _Node:
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = []
+
+
+class SearchIndex:
+
+    def __init__(self, listings):
+        # listings: dicts with at least id, name and symbol, as /v2/listings/ returns them
+        self.root = _Node()
+        self.symbols = {}
+        self.names = {}
+        self.keys = {}
+        self.deleted = None
+        for currency in sorted(listings, key=lambda currency: currency['id']):
+            symbol = currency['symbol'].upper()
+            self.symbols.setdefault(symbol, []).append(currency)
+            self.names.setdefault(currency['name'].lower(), []).append(currency)
+            self._insert(symbol.lower(), currency)
+            if currency['name'].lower() != symbol.lower():
+                self._insert(currency['name'].lower(), currency)
+
+    def _insert(self, key, currency):
+        node = self.root
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+        node.entries.append(currency)
+        self.keys.setdefault(key, []).append(currency)
+
+    def _build_deletions(self):
+        # (deletion, length of the prefix it came from) -> keys
+        self.deleted = {}
+        for key in self.keys:
+            prefix = key[:PREFIX_LENGTH]
+            for variant in deletions(prefix):
+                self.deleted.setdefault((variant, len(prefix)), []).append(key)
+
+    def exact(self, text):
+        # Coins whose symbol, or failing that whose name, is exactly text.
+        return self.symbols.get(text.upper()) or self.names.get(text.lower(), [])
+
+    def prefix(self, text, limit=LIMIT):
+        node = self.root
+        for ch in text.lower():
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        found = []
+        seen = set()
+        queue = deque([node])
+        while queue and len(found) < limit:
+            node = queue.popleft()
+            for currency in node.entries:
+                if currency['id'] not in seen:
+                    seen.add(currency['id'])
+                    found.append(currency)
+            queue.extend(node.children[ch] for ch in sorted(node.children))
+        return found[:limit]
+
+    def fuzzy(self, text, max_distance=MAX_DISTANCE, limit=LIMIT):
+        # [(distance, currency)] within max_distance edits of a symbol or name, closest first.
+        if self.deleted is None:
+            self._build_deletions()
+        word = text.lower()
+        max_distance = distance_limit(word, max_distance)
+        prefix = word[:PREFIX_LENGTH]
+
+        candidates = set()
+        for variant in deletions(prefix, max_distance):
+            # a key can only match if its own prefix is within max_distance
+            # deletions of this variant
+            for length in range(max(len(variant), len(prefix) - max_distance),
+                                min(len(variant), PREFIX_LENGTH) + max_distance + 1):
+                candidates.update(self.deleted.get((variant, length), ()))
+
+        best = {}
+        for key in candidates:
+            distance = edit_distance(word, key, max_distance)
+            if distance is None:
+                continue
+            for currency in self.keys[key]:
+                if distance < best.get(currency['id'], (max_distance + 1,))[0]:
+                    best[currency['id']] = (distance, currency)
+        matches = sorted(best.values(), key=lambda match: (match[0], match[1]['id']))
+        return matches[:limit]
+
+    def suggest(self, text, limit=LIMIT):
+        # Completions first, then near misses, without repeats.
+        suggestions = []
+        seen = set()
+        candidates = self.prefix(text, limit) + [currency for distance, currency in self.fuzzy(text, limit=limit)]
+        for currency in candidates:
+            if currency['id'] not in seen:
+                seen.add(currency['id'])
+                suggestions.append(currency)
+        return suggestions[:limit]
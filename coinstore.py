@@ -0,0 +1,136 @@
+# Append-only columnar store for ticker snapshots.
+# Every field lives in its own raw little-endian file under STORE_PATH/<convert>/,
+# one row per coin per fetch. Appends only ever add bytes to the end of each file,
+# and reads memory-map the files, so slicing by time or by coin never loads more
+# than the rows asked for. Rows are appended in fetch order, which keeps the
+# fetched_at column sorted and makes time-range lookups a binary search.
+
+import os
+import time
+
+import numpy as np
+
+from coinlock import locked
+from coinrecord import MarketSnapshot
+
+STORE_PATH = 'snapshots'
+
+FIELDS = [
+    ('fetched_at', '<f8'),
+    ('id', '<i4'),
+    ('last_updated', '<i8'),
+    ('price', '<f8'),
+    ('market_cap', '<f8'),
+    ('volume_24h', '<f8'),
+    ('percent_change_1h', '<f8'),
+    ('percent_change_24h', '<f8'),
+    ('percent_change_7d', '<f8'),
+]
+QUOTE_FIELDS = ['price', 'market_cap', 'volume_24h', 'percent_change_1h', 'percent_change_24h',
+                'percent_change_7d']
+
+
+def snapshot_columns(currencies, convert='USD', fetched_at=None):
+    # Turns a list of ticker dicts, or a coinrecord.MarketSnapshot, into one array
+    # per field; None becomes NaN.
+    if fetched_at is None:
+        fetched_at = time.time()
+    if isinstance(currencies, MarketSnapshot):
+        columns = {
+            'fetched_at': np.full(len(currencies), fetched_at, dtype='<f8'),
+            'id': currencies.column('id'),
+            'last_updated': np.nan_to_num(currencies.column('last_updated')).astype('<i8'),
+        }
+        for field in QUOTE_FIELDS:
+            columns[field] = currencies.column(field)
+        return columns
+
+    currencies = [currency for currency in currencies if currency is not None]
+
+    columns = {
+        'fetched_at': np.full(len(currencies), fetched_at, dtype='<f8'),
+        'id': np.array([currency['id'] for currency in currencies], dtype='<i4'),
+        'last_updated': np.array([currency.get('last_updated') or 0 for currency in currencies], dtype='<i8'),
+    }
+    for field in QUOTE_FIELDS:
+        values = [currency['quotes'][convert].get(field) for currency in currencies]
+        columns[field] = np.array([np.nan if value is None else value for value in values], dtype='<f8')
+    return columns
+
+
+class SnapshotStore:
+
+    def __init__(self, path=STORE_PATH, convert='USD'):
+        self.path = os.path.join(path, convert)
+        self.convert = convert
+        os.makedirs(self.path, exist_ok=True)
+
+    def _field_path(self, field):
+        return os.path.join(self.path, field + '.bin')
+
+    def __len__(self):
+        # A crash between two column appends can leave one file longer than the
+        # rest; the shortest column decides how many rows are complete.
+        lengths = []
+        for field, dtype in FIELDS:
+            try:
+                size = os.path.getsize(self._field_path(field))
+            except FileNotFoundError:
+                size = 0
+            lengths.append(size // np.dtype(dtype).itemsize)
+        return min(lengths)
+
+    def last_fetched_at(self, rows):
+        # fetched_at of the last complete row, None when the store is empty.
+        if not rows:
+            return None
+        with open(self._field_path('fetched_at'), 'rb') as inp:
+            inp.seek((rows - 1) * 8)
+            return float(np.frombuffer(inp.read(8), dtype='<f8')[0])
+
+    def append(self, currencies, fetched_at=None):
+        columns = snapshot_columns(currencies, self.convert, fetched_at)
+        if not len(columns['id']):
+            return 0
+        with locked(os.path.join(self.path, '.lock')):
+            rows = len(self)
+            if fetched_at is None:
+                # Stamped under the lock, and never before the last row, so concurrent
+                # appenders (or a clock stepping back) still leave fetched_at sorted.
+                last = self.last_fetched_at(rows)
+                columns['fetched_at'][:] = time.time() if last is None else max(time.time(), last)
+            for field, dtype in FIELDS:
+                with open(self._field_path(field), 'ab') as out:
+                    # Drop any partial tail left by an interrupted append before adding to it.
+                    out.truncate(rows * np.dtype(dtype).itemsize)
+                    out.write(np.ascontiguousarray(columns[field], dtype=dtype).tobytes())
+        return len(columns['id'])
+
+    def columns(self, fields=None):
+        # Read-only memory maps of every field, trimmed to the complete rows.
+        rows = len(self)
+        result = {}
+        for field, dtype in FIELDS:
+            if fields is not None and field not in fields:
+                continue
+            if rows == 0:
+                result[field] = np.empty(0, dtype=dtype)
+            else:
+                result[field] = np.memmap(self._field_path(field), dtype=dtype, mode='r', shape=(rows,))
+        return result
+
+    def time_range(self, start=None, end=None, fields=None):
+        # Rows fetched in [start, end) as zero-copy slices of the memory maps.
+        columns = self.columns(fields and set(fields) | {'fetched_at'})
+        fetched_at = columns['fetched_at']
+        lo = 0 if start is None else int(np.searchsorted(fetched_at, start, side='left'))
+        hi = len(fetched_at) if end is None else int(np.searchsorted(fetched_at, end, side='left'))
+        return {field: column[lo:hi] for field, column in columns.items()
+                if fields is None or field in fields}
+
+    def coin(self, coin_id, start=None, end=None, fields=None):
+        # One coin's rows within the time range, oldest first.
+        columns = self.time_range(start, end, fields and set(fields) | {'id'})
+        mask = columns['id'] == coin_id
+        return {field: np.asarray(column[mask]) for field, column in columns.items()
+                if fields is None or field in fields}
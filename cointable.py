@@ -0,0 +1,163 @@
+# Fast plain-text table renderer for large coin listings.
+# Drop-in for the PrettyTable calls the coin scripts make (Table(headers),
+# add_row, print(table)), but column widths are kept up to date as rows are
+# added, so rendering is a single formatting pass. Cell widths ignore ANSI
+# colour codes, so colorama-coloured cells still line up, and print_table can
+# stream the output a page at a time. LiveTable keeps a table on screen and
+# only rewrites the cells that changed between refreshes. Both report their
+# render time to coinmetrics.
+
+import re
+import sys
+import time
+
+import coinmetrics
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+
+def visible_width(text):
+    # Width of text on screen, not counting colour escape codes.
+    if '\x1b' in text:
+        text = ANSI_ESCAPE.sub('', text)
+    return len(text)
+
+
+def pad_cell(cell, width, column_width, align):
+    # cell is width characters wide on screen; pads it to column_width plus the
+    # one-space margin on each side.
+    pad = column_width - width
+    if align == 'l':
+        left = 0
+    elif align == 'r':
+        left = pad
+    else:
+        # same split as str.center, so output matches what PrettyTable printed
+        left = pad // 2 + (pad & column_width & 1)
+    return ' ' * (left + 1) + cell + ' ' * (pad - left + 1)
+
+
+class Table:
+
+    def __init__(self, field_names, align='c'):
+        self.field_names = [str(name) for name in field_names]
+        if isinstance(align, str):
+            align = [align] * len(self.field_names)
+        self.align = list(align)
+        self.rows = []
+        self.widths = [visible_width(name) for name in self.field_names]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add_row(self, row):
+        cells = [cell if isinstance(cell, str) else str(cell) for cell in row]
+        widths = [visible_width(cell) for cell in cells]
+        self.rows.append((cells, widths))
+        self.widths = list(map(max, self.widths, widths))
+
+    def border(self):
+        return '+' + '+'.join('-' * (width + 2) for width in self.widths) + '+'
+
+    def format_row(self, cells, widths):
+        return '|' + '|'.join(map(pad_cell, cells, widths, self.widths, self.align)) + '|'
+
+    def header_lines(self):
+        border = self.border()
+        return [border, self.format_row(self.field_names, [visible_width(name) for name in self.field_names]),
+                border]
+
+    def pages(self, page_size=None):
+        # Yields the rendered table in chunks of page_size rows (all at once if None).
+        # Every page repeats the header so it reads on its own.
+        border = self.border()
+        header = self.header_lines()
+        page_size = page_size or max(1, len(self.rows))
+        format_row = self.format_row
+        for start in range(0, max(1, len(self.rows)), page_size):
+            lines = header + [format_row(cells, widths) for cells, widths in self.rows[start:start + page_size]]
+            lines.append(border)
+            yield '\n'.join(lines)
+
+    def get_string(self):
+        return next(self.pages())
+
+    def __str__(self):
+        return self.get_string()
+
+
+def print_table(table, page_size=None, out=None):
+    # Writes the table page by page. On a terminal it waits for Enter between
+    # pages, and q stops early.
+    out = out or sys.stdout
+    interactive = page_size and out.isatty() and sys.stdin.isatty()
+    started = time.perf_counter()
+    waited = 0.0
+    pages = table.pages(page_size)
+    for i, page in enumerate(pages):
+        if i and interactive:
+            prompted = time.perf_counter()
+            answer = input('-- more (Enter to continue, q to stop) -- ')
+            waited += time.perf_counter() - prompted
+            if answer.strip().lower() == 'q':
+                break
+        out.write(page)
+        out.write('\n')
+        out.flush()
+    # time spent waiting at the prompt is the reader's, not rendering
+    coinmetrics.observe('coin_render_seconds', time.perf_counter() - started - waited, view='print')
+
+
+class LiveTable:
+    # Keeps a Table on a terminal screen. Each draw() only rewrites the cells and
+    # footer lines that differ from the previous frame; anything that changes the
+    # layout (column widths, row count, header or footer length) redraws it all.
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.layout = None
+        self.cells = None
+        self.footer = None
+
+    def draw(self, table, header=(), footer=()):
+        with coinmetrics.timer('coin_render_seconds', view='live'):
+            self._draw(table, header, footer)
+
+    def _draw(self, table, header, footer):
+        header = list(header)
+        footer = list(footer)
+        cells = [row_cells for row_cells, row_widths in table.rows]
+        layout = (header, list(table.widths), len(cells), len(footer))
+
+        if layout != self.layout:
+            self.out.write('\x1b[?25l\x1b[H\x1b[2J' + '\n'.join(header + [table.get_string()] + footer) + '\n')
+        else:
+            parts = []
+            # screen lines are 1-based; the table's first row sits under its header block
+            first_row = len(header) + 4
+            for i, ((row_cells, row_widths), old_cells) in enumerate(zip(table.rows, self.cells)):
+                if row_cells == old_cells:
+                    continue
+                column = 2
+                for cell, old_cell, width, column_width, align in zip(row_cells, old_cells, row_widths,
+                                                                       table.widths, table.align):
+                    if cell != old_cell:
+                        parts.append('\x1b[' + str(first_row + i) + ';' + str(column) + 'H'
+                                     + pad_cell(cell, width, column_width, align))
+                    column += column_width + 3
+
+            footer_row = first_row + len(cells) + 1
+            for i, (line, old_line) in enumerate(zip(footer, self.footer)):
+                if line != old_line:
+                    parts.append('\x1b[' + str(footer_row + i) + ';1H' + line + '\x1b[K')
+            parts.append('\x1b[' + str(footer_row + len(footer)) + ';1H')
+            self.out.write(''.join(parts))
+
+        self.out.flush()
+        self.layout = layout
+        self.cells = cells
+        self.footer = footer
+
+    def close(self):
+        self.out.write('\x1b[?25h\n')
+        self.out.flush()
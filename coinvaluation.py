@@ -0,0 +1,136 @@
+# Vectorized portfolio valuation across many accounts.
+# Positions are held as parallel NumPy columns: an account code, a symbol code
+# and the amount as a fixed-point integer (AMOUNT_SCALE units per coin), so
+# adding up repeated holdings is exact. Valuation is one gather of a price
+# vector by symbol code. Account totals are also summed in Decimal over the
+# (account, symbol) pairs, so the reported totals are exact for the prices given.
+
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+AMOUNT_DECIMALS = 8
+AMOUNT_SCALE = 10 ** AMOUNT_DECIMALS
+DECIMAL_PRECISION = 60   # enough digits that amount * price never rounds
+DEFAULT_ACCOUNT = 'default'
+
+
+def parse_amount(amount):
+    # '1.5' -> 150000000; more than AMOUNT_DECIMALS decimal places is an error.
+    scaled = Decimal(amount).scaleb(AMOUNT_DECIMALS)
+    if scaled != scaled.to_integral_value():
+        raise ValueError('amount has more than ' + str(AMOUNT_DECIMALS) + ' decimal places: ' + amount)
+    return int(scaled)
+
+
+class Positions:
+
+    def __init__(self, accounts, symbols, account_codes, symbol_codes, amounts):
+        self.accounts = accounts            # code -> account name
+        self.symbols = symbols              # code -> symbol
+        self.account_codes = account_codes  # one entry per position
+        self.symbol_codes = symbol_codes
+        self.amounts = amounts              # fixed-point, AMOUNT_SCALE units per coin
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @classmethod
+    def from_rows(cls, rows):
+        # rows of (account, symbol, amount string)
+        account_index = {}
+        symbol_index = {}
+        account_codes = []
+        symbol_codes = []
+        amounts = []
+        for account, symbol, amount in rows:
+            account_codes.append(account_index.setdefault(account, len(account_index)))
+            symbol_codes.append(symbol_index.setdefault(symbol.upper(), len(symbol_index)))
+            amounts.append(parse_amount(amount))
+
+        # int64 covers about 92 billion coins per total; past that fall back to Python ints
+        dtype = np.int64 if sum(abs(amount) for amount in amounts) < 2 ** 63 else object
+        return cls(list(account_index), list(symbol_index),
+                   np.array(account_codes, dtype=np.int32), np.array(symbol_codes, dtype=np.int32),
+                   np.array(amounts, dtype=dtype))
+
+    def grouped_totals(self, keys):
+        # (distinct keys in ascending order, exact sum of amounts for each).
+        if not len(keys):
+            return keys[:0], self.amounts[:0]
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        return sorted_keys[starts], np.add.reduceat(self.amounts[order], starts)
+
+    def totals_by(self, keys, size):
+        # Exact sum of amounts for every key in range(size).
+        totals = np.zeros(size, dtype=self.amounts.dtype)
+        present, sums = self.grouped_totals(keys)
+        totals[present] = sums
+        return totals
+
+    def symbol_totals(self):
+        return self.totals_by(self.symbol_codes, len(self.symbols))
+
+    def account_symbol_totals(self):
+        # (account codes, symbol codes, amounts) for each (account, symbol) pair that
+        # is held, so the cost follows the positions rather than accounts x symbols.
+        keys = self.account_codes.astype(np.int64) * len(self.symbols) + self.symbol_codes
+        present, sums = self.grouped_totals(keys)
+        accounts, symbols = np.divmod(present, len(self.symbols))
+        return accounts, symbols, sums
+
+
+def read_positions(path):
+    # 'ACCOUNT TICKER amount' per line; plain 'TICKER amount' lines go to DEFAULT_ACCOUNT.
+    rows = []
+    with open(path) as inp:
+        for line in inp:
+            parts = line.split()
+            if not parts or parts[0].startswith('#'):
+                continue
+            if len(parts) == 2:
+                rows.append((DEFAULT_ACCOUNT, parts[0], parts[1]))
+            else:
+                rows.append((parts[0], parts[1], parts[2]))
+    return Positions.from_rows(rows)
+
+
+class Valuation:
+
+    def __init__(self, positions, prices):
+        # prices: symbol -> price (float, str or Decimal); symbols without a price value at NaN
+        # and are listed in missing.
+        self.positions = positions
+        price_column = [prices.get(symbol) for symbol in positions.symbols]
+        self.missing = [symbol for symbol, price in zip(positions.symbols, price_column) if price is None]
+        self.price_vector = np.array([np.nan if price is None else float(price) for price in price_column])
+        self.decimal_prices = [None if price is None else Decimal(str(price)) for price in price_column]
+
+        # float view, one gather for every position
+        coins = positions.amounts.astype(np.float64) / AMOUNT_SCALE
+        self.position_values = coins * self.price_vector[positions.symbol_codes]
+        self.symbol_amounts = positions.symbol_totals()
+        self.symbol_values = self.symbol_amounts.astype(np.float64) / AMOUNT_SCALE * self.price_vector
+
+        with localcontext() as context:
+            context.prec = DECIMAL_PRECISION
+            self.account_totals = self._exact_account_totals()
+            self.total = sum(self.account_totals.values(), Decimal(0))
+
+    def _exact_account_totals(self):
+        accounts, symbols, amounts = self.positions.account_symbol_totals()
+        totals = dict((account, Decimal(0)) for account in self.positions.accounts)
+        scale = Decimal(AMOUNT_SCALE)
+        for account, symbol, amount in zip(accounts.tolist(), symbols.tolist(), amounts.tolist()):
+            price = self.decimal_prices[symbol]
+            if amount and price is not None:
+                totals[self.positions.accounts[account]] += Decimal(int(amount)) * price / scale
+        return totals
+
+    def symbol_rows(self):
+        # (symbol, Decimal amount held, float value) per symbol, largest value first.
+        order = np.argsort(-np.nan_to_num(self.symbol_values, nan=-np.inf), kind='stable')
+        return [(self.positions.symbols[i], Decimal(int(self.symbol_amounts[i])).scaleb(-AMOUNT_DECIMALS),
+                 float(self.symbol_values[i])) for i in order.tolist()]
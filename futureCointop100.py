@@ -1,59 +1,94 @@
 import math
 import json
-import locale
+import numpy as np
 import requests
+from coinapi import API_URL, get_json
 from prettytable import PrettyTable
 
-locale.setlocale(locale.LC_ALL, 'en_US.UTF-8')
+global_url = API_URL + 'global/'
+ticker_url = API_URL + 'ticker/?structure=array'
 
-global_url = 'https://api.coinmarketcap.com/v2/global'
-ticker_url = 'https://api.coinmarketcap.com/v2/ticker/?structure=array'
+# (column heading, total crypto market cap in USD) for each "what if crypto reached X" column
+scenarios = [
+    ('7.7T (Gold)', 7.7e12),
+    ('36.8T (Narrow Money)', 36.8e12),
+    ('73T (World Stock Markets)', 73e12),
+    ('90.4T (Broad Money)', 90.4e12),
+    ('217T (Real Estate)', 217e12),
+    ('544T (Derivatives)', 544e12),
+]
 
-request = requests.get(global_url)
-results = request.json()
+
+def money_strings(values):
+    # '${:,.2f}' over a whole array. Every cell's digits, commas and cents are laid
+    # out as one matrix of character codes and read back as strings, so the cost is
+    # a few NumPy passes rather than a format call per cell. The few cells that
+    # integer cents cannot hold exactly (huge, infinite, or within a hair of a
+    # rounding tie) go through format itself. NaN (no supply or no market cap)
+    # shows as n/a.
+    values = np.asarray(values, dtype=float)
+    flat = values.ravel()
+    strings = np.full(flat.shape, 'n/a', dtype=object)
+    scaled = np.abs(flat) * 100
+    cents = np.round(scaled)
+    with np.errstate(invalid='ignore'):
+        exact = (cents < 2.0 ** 43) & (np.abs(scaled - cents) < 0.49)
+
+    if exact.any():
+        cents = cents[exact].astype(np.int64)
+        whole = cents // 100
+        groups = -(-len(str(whole.max())) // 3)
+        powers = 10 ** np.arange(groups * 3 - 1, -1, -1, dtype=np.int64)
+        digits = np.where(whole[:, None] >= powers, whole[:, None] // powers % 10 + ord('0'), ord(' '))
+        digits[:, -1] = whole % 10 + ord('0')
+        commas = np.where(whole[:, None] >= 1000 ** np.arange(groups, 0, -1, dtype=np.int64), ord(','), ord(' '))
+        codes = np.concatenate([np.concatenate([commas[:, :, None], digits.reshape(-1, groups, 3)], axis=2)
+                                .reshape(-1, groups * 4),
+                                np.full((len(cents), 1), ord('.')), (cents % 100 // 10 + ord('0'))[:, None],
+                                (cents % 10 + ord('0'))[:, None]], axis=1)
+        text = np.ascontiguousarray(codes, dtype=np.uint32).view('U' + str(groups * 4 + 3))[:, 0]
+        strings[exact] = np.char.add(np.where(np.signbit(flat[exact]), '$-', '$'), np.char.lstrip(text))
+
+    rest = ~exact & ~np.isnan(flat)
+    strings[rest] = ['${:,.2f}'.format(value) for value in flat[rest].tolist()]
+    return strings.reshape(values.shape)
+
+
+results = get_json(global_url)
 data = results['data']
 global_cap = int(data['quotes']['USD']['total_market_cap'])
 
-table = PrettyTable(['Name', 'Ticker', '% of total global cap', 'Current', '7.7T (Gold)', '36.8T (Narrow Money)', '73T (World Stock Markets)', '90.4T (Broad Money)', '217T (Real Estate)', '544T (Derivatives)'])
+table = PrettyTable(['Name', 'Ticker', '% of total global cap', 'Current'] + [label for label, cap in scenarios])
 
-request = requests.get(ticker_url)
-results = request.json()
+results = get_json(ticker_url)
 data = results['data']
 
-for currency in data:
-    name = currency['name']
-    ticker = currency['symbol']
-    percentage_of_global_cap = float(currency['quotes']['USD']['market_cap']) / float(global_cap)
-
-    current_price = round(float(currency['quotes']['USD']['price']),2)
-    available_supply = float(currency['total_supply'])
-
-    trillion7price = round(7700000000000 * percentage_of_global_cap / available_supply,2)
-    trillion36price = round(36000000000000 * percentage_of_global_cap / available_supply,2)
-    trillion73price = round(73000000000000 * percentage_of_global_cap / available_supply,2)
-    trillion90price = round(90400000000000 * percentage_of_global_cap / available_supply,2)
-    trillion217price = round(217000000000000 * percentage_of_global_cap / available_supply,2)
-    trillion544price = round(544000000000000 * percentage_of_global_cap / available_supply,2)
-
-    percentage_of_global_cap_string = str(round(percentage_of_global_cap*100,2)) + '%'
-    current_price_string = '$' + str(current_price)
-    trillion7price_string = '$' + locale.format('%.2f',trillion7price,True)
-    trillion36price_string = '$' + locale.format('%.2f',trillion36price,True)
-    trillion73price_string = '$' + locale.format('%.2f',trillion73price,True)
-    trillion90price_string = '$' + locale.format('%.2f',trillion90price,True)
-    trillion217price_string = '$' + locale.format('%.2f',trillion217price,True)
-    trillion544price_string = '$' + locale.format('%.2f',trillion544price,True)
-
-    table.add_row([name,
-                   ticker,
-                   percentage_of_global_cap_string,
-                   current_price_string,
-                   trillion7price_string,
-                   trillion36price_string,
-                   trillion73price_string,
-                   trillion90price_string,
-                   trillion217price_string,
-                   trillion544price_string])
+# one column per field, None -> NaN
+names = [currency['name'] for currency in data]
+tickers = [currency['symbol'] for currency in data]
+market_caps = np.array([currency['quotes']['USD']['market_cap'] for currency in data], dtype=float)
+current_prices = np.array([currency['quotes']['USD']['price'] for currency in data], dtype=float)
+total_supplies = np.array([currency['total_supply'] for currency in data], dtype=float)
+total_supplies[total_supplies <= 0] = np.nan
+
+percentage_of_global_cap = market_caps / float(global_cap)
+scenario_caps = np.array([cap for label, cap in scenarios])
+
+# coins x scenarios: each coin keeps its share of the global cap in every scenario
+with np.errstate(invalid='ignore', divide='ignore'):
+    scenario_prices = np.round(np.outer(percentage_of_global_cap, scenario_caps) / total_supplies[:, None], 2)
+
+# a coin with no market cap shows n/a, as its money cells do
+percentage_strings = np.where(np.isnan(percentage_of_global_cap), 'n/a',
+                              np.char.add(np.round(percentage_of_global_cap * 100, 2).astype(str), '%'))
+current_price_strings = money_strings(np.round(current_prices, 2))
+scenario_price_strings = money_strings(scenario_prices)
+
+for i in range(len(data)):
+    table.add_row([names[i],
+                   tickers[i],
+                   percentage_strings[i],
+                   current_price_strings[i]] + scenario_price_strings[i].tolist())
 
 print()
 print(table)
@@ -1,52 +1,30 @@
-import xlsxwriter
+import argparse
+import sys
 import requests
 import json
+from coinapi import PAGE_SIZE, fetch_global, iter_ticker_pages
+from coinexport import EXTENSIONS, FORMATS, export
 
-start = 1
-f = 1
+convert = 'USD'
+max_workers = 8
 
-crypto_workbook = xlsxwriter.Workbook('cryptocurrencies.xlsx')
-crypto_sheet = crypto_workbook.add_worksheet()
+parser = argparse.ArgumentParser(description='Export every listed coin to a spreadsheet or data file.')
+parser.add_argument('--format', choices=FORMATS, default='xlsx', help='output format (default: xlsx)')
+parser.add_argument('--output', help='output path (default: cryptocurrencies.<format>)')
+args = parser.parse_args()
 
-crypto_sheet.write('A1', 'Name')
-crypto_sheet.write('B1', 'Symbol')
-crypto_sheet.write('C1', 'Market Cap')
-crypto_sheet.write('D1', 'Price')
-crypto_sheet.write('E1', '24H Volume')
-crypto_sheet.write('F1', 'Hour Change')
-crypto_sheet.write('G1', 'Day Change')
-crypto_sheet.write('H1', 'Week Change')
+output = args.output or 'cryptocurrencies' + EXTENSIONS[args.format]
 
-for i in range(10):
-    ticker_url = 'https://api.coinmarketcap.com/v2/ticker/?structure=array&start=' + str(start)
+total = fetch_global(convert)['active_cryptocurrencies']
+starts = range(1, total + 1, PAGE_SIZE)
 
-    request = requests.get(ticker_url)
-    results = request.json()
-    data = results['data']
+# pages are fetched concurrently but handed to the exporter in rank order as they arrive;
+# pages that keep failing are left out and listed below
+missing = []
+rows = export(iter_ticker_pages(starts, convert, max_workers, missing=missing), args.format, output, convert)
 
-    for currency in data:
-        rank = currency['rank']
-        name = currency['name']
-        symbol = currency['symbol']
-        quotes = currency['quotes']['USD']
-        market_cap = quotes['market_cap']
-        hour_change = quotes['percent_change_1h']
-        day_change = quotes['percent_change_24h']
-        week_change = quotes['percent_change_7d']
-        price = quotes['price']
-        volume = quotes['volume_24h']
-
-        crypto_sheet.write(f,0,name)
-        crypto_sheet.write(f,1,symbol)
-        crypto_sheet.write(f,2,str(market_cap))
-        crypto_sheet.write(f,3,str(price))
-        crypto_sheet.write(f,4,str(volume))
-        crypto_sheet.write(f,5,str(hour_change))
-        crypto_sheet.write(f,6,str(day_change))
-        crypto_sheet.write(f,7,str(week_change))
-
-        f += 1
-
-    start += 100
-
-crypto_workbook.close()
+print('Wrote ' + '{:,}'.format(rows) + ' coins to ' + output)
+if missing:
+    print('Could not fetch ranks ' + ', '.join(str(first) + '-' + str(last) for first, last in missing)
+          + '; those coins are missing from ' + output)
+    sys.exit(1)